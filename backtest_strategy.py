@@ -1,8 +1,70 @@
+import os
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+from numba import njit
 from backtesting import Backtest, Strategy
 
-# 1. 策略邏輯 (Tier 2: 階梯式加碼)
+# MFI 公式只寫一份，放在 calc_mfi.py
+from calc_mfi import mfi
+
+
+# 回測資金設定 (策略的 JIT 核心也要用同一組數字)
+CASH = 1_000_000
+COMMISSION = .001425
+
+# 每根 K 棒的動作代碼
+HOLD, CLOSE, BUY_HEAVY, BUY_LIGHT = 0, 1, 2, 3
+
+# 1. 策略核心：用 Numba 編譯的單趟迴圈，一次算完整段歷史
+# 以收盤價成交 (trade_on_close=True)，規則跟原本 next() 的階梯式加碼一樣
+@njit(cache=True)
+def _run(mfi, close, buy_level, sell_level, cash, commission):
+    n = len(mfi)
+    equity = np.empty(n)
+    actions = np.zeros(n, dtype=np.int8)
+    size = 0
+    for i in range(n):
+        price = close[i]
+        value = cash + size * price
+        equity[i] = value
+
+        # A. 安全檢查：如果破產了就別算了
+        if value <= 0:
+            continue
+
+        # B. 出場邏輯 (獲利了結)
+        if size > 0 and mfi[i] > sell_level:
+            cash += size * price * (1 - commission)
+            size = 0
+            actions[i] = CLOSE
+            equity[i] = cash
+            continue
+
+        # C. 進場邏輯：階梯式加碼 (持倉比例 = 市值 / 總資產)
+        if size * price / value >= 0.8:
+            continue
+
+        # 情況 1: 世紀大特價 (MFI < 20) -> 重倉買 30%
+        # 情況 2: 普通特價 (MFI < buy_level) -> 試單買 15%
+        if mfi[i] < 20:
+            action, fraction = BUY_HEAVY, 0.3
+        elif mfi[i] < buy_level:
+            action, fraction = BUY_LIGHT, 0.15
+        else:
+            continue
+
+        shares = int(cash * fraction // (price * (1 + commission)))
+        if shares > 0:
+            cash -= shares * price * (1 + commission)
+            size += shares
+            actions[i] = action
+            equity[i] = cash + size * price
+
+    return equity, actions
+
+
+# 2. 策略外殼 (Tier 2: 階梯式加碼)
+# init 只呼叫一次 _run，next 只照著算好的動作下單，讓 backtesting.py 產生報表
 class MfiHunter(Strategy):
     # 使用我們之前算出來的神之參數
     mfi_period = 16
@@ -10,70 +72,50 @@ class MfiHunter(Strategy):
     sell_level = 85
     
     def init(self):
-        self.mfi = self.I(ta.mfi, 
-                          pd.Series(self.data.High), 
-                          pd.Series(self.data.Low), 
-                          pd.Series(self.data.Close), 
-                          pd.Series(self.data.Volume), 
-                          length=self.mfi_period)
+        self.mfi = self.I(mfi, self.data.High, self.data.Low, self.data.Close, self.data.Volume,
+                          self.mfi_period, name='MFI')
+        # 權益曲線交給 backtesting 自己算，這裡只要每根 K 棒的動作
+        _, self.actions = _run(np.asarray(self.mfi, dtype=np.float64),
+                               np.asarray(self.data.Close, dtype=np.float64),
+                               self.buy_level, self.sell_level,
+                               CASH, COMMISSION)
 
     def next(self):
-        # A. 安全檢查：如果破產了就別算了
-        if self.equity == 0: return 
-        
-        # --- 修正重點：手動算市值 ---
-        # 既然它不給我們 .value 也不給 .cash，我們就自己算！
-        # 市值 = 手上的股數 (size) * 現在的股價 (Close[-1])
-        position_value = self.position.size * self.data.Close[-1]
-        
-        # 現在我們可以算出真實的持倉比例了
-        current_pct = position_value / self.equity
-        # ------------------------
+        action = self.actions[len(self.data) - 1]
+        if action == CLOSE:
+            self.position.close()
+        elif action == BUY_HEAVY:
+            self.buy(size=0.3)
+        elif action == BUY_LIGHT:
+            self.buy(size=0.15)
 
-        # B. 出場邏輯 (獲利了結)
-        if self.position:
-            if self.mfi[-1] > self.sell_level:
-                self.position.close()
-                return 
-
-        # C. 進場邏輯：階梯式加碼
-        if current_pct < 0.8:
-            
-            # 情況 1: 世紀大特價 (MFI < 20) -> 重倉買
-            if self.mfi[-1] < 20:
-                self.buy(size=0.3) 
-                
-            # 情況 2: 普通特價 (MFI < 35) -> 試單
-            elif self.mfi[-1] < self.buy_level:
-                self.buy(size=0.15)
-            
-            # 情況 1: 世紀大特價 (MFI < 20) -> 重倉買 30%
-            if self.mfi[-1] < 20:
-                self.buy(size=0.3) 
-                
-            # 情況 2: 普通特價 (MFI < 35) -> 試單買 15%
-            elif self.mfi[-1] < self.buy_level:
-                self.buy(size=0.15) 
-
-# 2. 準備數據 (確保讀取的是 6944)
-df = pd.read_csv("6944.TW_history.csv", index_col=0, parse_dates=True, header=[0, 1])
-df.columns = df.columns.droplevel(1) 
-df.columns = [c.capitalize() for c in df.columns] 
-for c in ['Open', 'High', 'Low', 'Close', 'Volume']:
-    df[c] = pd.to_numeric(df[c], errors='coerce')
-df = df.dropna()
-
-# 3. 設定回測引擎
+# 3. 準備數據 (確保讀取的是 6944)
+# 有 Parquet 就讀 Parquet (fetch_data.py 存的，型別都在)，不然退回舊的 CSV
+if os.path.exists("6944.TW.parquet"):
+    df = pd.read_parquet("6944.TW.parquet").set_index('Date')
+else:
+    df = pd.read_csv("6944.TW_history.csv", index_col=0, parse_dates=True, header=[0, 1])
+    df.columns = df.columns.droplevel(1) 
+    df.columns = [c.capitalize() for c in df.columns] 
+cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+# 已經是數字就不用再轉，有髒資料才一次整批轉型
+if not all(pd.api.types.is_numeric_dtype(t) for t in df[cols].dtypes):
+    df[cols] = df[cols].apply(pd.to_numeric, errors='coerce')
+df = df.dropna(subset=cols)
+
+# 4. 設定回測引擎
 bt = Backtest(df, MfiHunter,
-              cash=1_000_000,
-              commission=.001425,
+              cash=CASH,
+              commission=COMMISSION,
               trade_on_close=True)
 
-# 4. 執行「單次」回測 (Single Run)
+# 5. 執行「單次」回測 (Single Run)
 # 這裡我們不跑 optimize，避免 Mac 報錯，直接看新邏輯的表現
 print("正在測試階梯式加碼邏輯...")
 stats = bt.run()
 print(stats)
 
-# 5. 畫圖
-bt.plot()
\ No newline at end of file
+# 6. 畫圖 (Bokeh 要序列化整段歷史，很花時間)
+# 自動化或大量測參數時設 BT_PLOT=0 就會跳過
+if os.environ.get("BT_PLOT", "1") == "1":
+    bt.plot()
\ No newline at end of file
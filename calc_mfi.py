@@ -1,28 +1,69 @@
+import os
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import polars as pl
 
-# 1. 讀取 CSV (關鍵修正！)
-# header=[0, 1] 告訴 pandas：前兩行都是標題，不要把它當成數據讀進來
-# 這樣 "6944.TW" 那一行就會被正確處理，不會污染數據
-df = pd.read_csv("2337.TW_history.csv", index_col=0, parse_dates=True, header=[0, 1])
 
-# 2. 清洗標題
-# 我們不需要第二層的 "6944.TW" 標籤，把它丟掉，讓欄位變回乾淨的 'Close', 'High'
-df.columns = df.columns.droplevel(1)
+# 純 NumPy 的 n 日加總，前 n-1 天沒有完整視窗就是 NaN (跟 pandas 的 rolling 一樣)
+def _rolling_sum(x, n):
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n).sum(axis=1)
+    return out
 
-# 3. 雙重保險 (Type Casting)
-# 強制把這幾個欄位轉成數字，如果有任何髒東西轉不過來，就變 NaN
-cols = ['Open', 'High', 'Low', 'Close', 'Volume']
-for c in cols:
-    df[c] = pd.to_numeric(df[c], errors='coerce')
+# NumPy 版 MFI：用 np.where + rolling sum 取代 pandas_ta，快一個數量級
+# 全程只用 ndarray，不會建立任何 pd.Series
+def mfi(high, low, close, volume, n):
+    """
+    對齊的是原本 calc_mfi.py 用的 pandas_ta.mfi (也就是存好的 *_mfi_calculated.csv)，
+    不是 dashboard.py 以前用的 pandas_ta_classic.mfi。
+    pandas_ta_classic 把平盤日 (典型價格沒變) 當成既不流入也不流出，第一個值也早一根 K 棒出現，
+    所以 dashboard 的 MFI 在平盤日附近會跟以前不一樣 (6944 上最多差約 11 點)。
+    """
+    typical_price = (high + low + close) / 3
+    money_flow = typical_price * volume
+    diff = np.diff(typical_price, prepend=np.nan)
+    # 典型價格沒漲的日子 (包含平盤) 都算資金流出，跟 pandas_ta 一樣 (pandas_ta_classic 不算平盤)
+    pos_flow = np.where(diff > 0, money_flow, 0.0)
+    neg_flow = np.where(diff > 0, 0.0, money_flow)
+    # 第一天沒有前一天可比，設成 NaN，跟 pandas_ta 一樣從第 n+1 天才開始有值
+    pos_flow[0] = neg_flow[0] = np.nan
+    pos_sum = _rolling_sum(pos_flow, n)
+    neg_sum = _rolling_sum(neg_flow, n)
+    # 100 - 100 / (1 + pos/neg) 的等價寫法，neg 為 0 時不會除以零
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * pos_sum / (pos_sum + neg_sum)
 
-# 4. 計算 14 日 MFI
-df['MFI'] = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=14)
 
-# 5. 見證奇蹟
-print("\n--- 2337.TW MFI 計算結果 (最後 5 天) ---")
-print(df[['Close', 'MFI']].tail(5))
+# 被 backtest_strategy.py import 時只要上面的 mfi()，下面的腳本不要跑
+if __name__ == "__main__":
+    # 1. 讀取數據
+    # 優先讀 fetch_data.py 存的 Parquet (自帶欄位型別，不用再整理標題)
+    if os.path.exists("2337.TW.parquet"):
+        df = pd.read_parquet("2337.TW.parquet").set_index('Date')
+    else:
+        # 2. 舊的 CSV (關鍵修正！)
+        # yfinance 的 CSV 前三行都是標題 (Price / Ticker / Date)
+        # 用第一行當欄位名稱，後面兩行直接跳過，"2337.TW" 那一行就不會污染數據
+        # Polars 的 CSV 讀取器是多執行緒的，讀完再轉成 pandas
+        # 第一欄其實是日期 (標題寫的是 "Price")，改名後設成索引
+        raw = pl.read_csv("2337.TW_history.csv", skip_rows_after_header=2, try_parse_dates=True)
+        df = raw.rename({raw.columns[0]: 'Date'}).to_pandas().set_index('Date')
 
-# 6. 存個乾淨的檔
-df.to_csv("2337_mfi_calculated.csv")
-print("\n✅ 修復完成！乾淨的數據已存檔。")
\ No newline at end of file
+    # 3. 雙重保險 (Type Casting)
+    # 強制把這幾個欄位轉成數字，如果有任何髒東西轉不過來，就變 NaN
+    # 乾淨的檔案 (欄位本來就是數字) 直接跳過，不用再轉一次
+    cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    if not all(pd.api.types.is_numeric_dtype(t) for t in df[cols].dtypes):
+        df[cols] = df[cols].apply(pd.to_numeric, errors='coerce')
+
+    # 4. 計算 14 日 MFI
+    df['MFI'] = mfi(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), df['Volume'].to_numpy(), 14)
+
+    # 5. 見證奇蹟
+    print("\n--- 2337.TW MFI 計算結果 (最後 5 天) ---")
+    print(df[['Close', 'MFI']].tail(5))
+
+    # 6. 存個乾淨的檔
+    df.to_csv("2337_mfi_calculated.csv")
+    print("\n✅ 修復完成！乾淨的數據已存檔。")
\ No newline at end of file
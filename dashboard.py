@@ -1,6 +1,9 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np  # 1. 先叫出 numpy
+import polars as pl
+import pyarrow.parquet as pq
 
 # --- 💉 基因改造手術開始 (Monkey Patch) ---
 # 這是為了修復 NumPy 2.0 和舊版 Bokeh 的衝突
@@ -9,7 +12,6 @@ if not hasattr(np, 'bool8'):
     np.bool8 = np.bool_
 # --- 手術結束 ---
 
-import pandas_ta_classic as ta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from backtesting import Backtest, Strategy
@@ -29,37 +31,113 @@ sell_level = st.sidebar.slider("賣出門檻 (Sell >)", 60, 95, 85)
 # --- 3. 定義回測策略 (為了即時計算勝率) ---
 # 這是為了讓 Dashboard 能動態算出「這組參數好不好」
 class DashboardStrategy(Strategy):
-    # 這些參數稍後會被動態覆寫
+    # 預設值，實際數字由 bt.run() 每次傳入
     mfi_period = 14
     buy_level = 30 
     sell_level = 80
+    # 已經算好 (而且有快取) 的 MFI 陣列，跑回測前塞進來
+    mfi_precomputed = None
     
     def init(self):
-        self.mfi = self.I(ta.mfi, pd.Series(self.data.High), pd.Series(self.data.Low), 
-                          pd.Series(self.data.Close), pd.Series(self.data.Volume), length=self.mfi_period)
+        # 直接包裝現成的陣列當指標，不要再重算一次 MFI
+        self.mfi = self.I(lambda: self.mfi_precomputed, name='MFI')
 
     def next(self):
         # 這裡的邏輯只為了計算績效，簡單版即可
-        if not self.position and self.mfi[-1] < self.buy_level:
+        # MFI 跟持倉狀態各只查一次，每根 K 棒都會跑到這裡
+        m = self.mfi[-1]
+        if self.position:
+            if m > self.sell_level:
+                self.position.close()
+        elif m < self.buy_level:
             self.buy()
-        elif self.position and self.mfi[-1] > self.sell_level:
-            self.position.close()
 
 # --- 4. 讀取數據 ---
-@st.cache_data
-def load_data(ticker_name):
+# 原始數據用 Arrow table 放在 cache_resource：不像 cache_data 每次 rerun 都要 pickle 複製一份
+# 注意：這份 table 是所有連線共用的，只能讀、不能改
+@st.cache_resource
+def load_table(ticker_name):
+    parquet_file = f"{ticker_name}.parquet"
     filename = f"{ticker_name}_history.csv"
     try:
-        df = pd.read_csv(filename, index_col=0, parse_dates=True, header=[0, 1])
-        df.columns = df.columns.droplevel(1)
-        df.columns = [c.capitalize() for c in df.columns]
-        for c in ['Open', 'High', 'Low', 'Close', 'Volume']:
-            df[c] = pd.to_numeric(df[c], errors='coerce')
-        df = df.dropna()
-        return df
+        if os.path.exists(parquet_file):
+            # fetch_data.py 存的 Parquet 自帶欄位型別，直接讀就好
+            return pq.read_table(parquet_file)
+        # 舊的 CSV：yfinance 有三行標題 (Price / Ticker / Date)，用第一行當欄位名稱、跳過後兩行
+        # Polars 的 CSV 讀取器是多執行緒的 Rust 實作，比 pandas 的 header=[0, 1] 快很多
+        raw = pl.read_csv(filename, skip_rows_after_header=2, try_parse_dates=True)
+        return raw.rename({raw.columns[0]: 'Date'}).to_arrow()
     except FileNotFoundError:
         return None
 
+def load_data(ticker_name):
+    table = load_table(ticker_name)
+    if table is None:
+        return None
+    # split_blocks 讓每個欄位各自轉換，沒有空值的數字欄位可以直接共用 Arrow 的記憶體
+    df = table.to_pandas(split_blocks=True, date_as_object=False).set_index('Date')
+    cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    # yfinance 的數據本來就是數字，只有混到髒資料時才需要整批轉型
+    if not all(pd.api.types.is_numeric_dtype(t) for t in df[cols].dtypes):
+        df[cols] = df[cols].apply(pd.to_numeric, errors='coerce')
+    return df.dropna(subset=cols)
+
+# 整條 MFI 計算寫成 Polars lazy 查詢：從快取的 Arrow table 出發 (不用重讀檔案)，
+# 讓查詢最佳化器把中間欄位合併處理，最後只把 MFI 這一欄轉成 NumPy 交給畫圖跟回測
+# 以 (股票, 天數) 當快取 key，畫圖跟回測共用同一份結果
+@st.cache_data
+def compute_mfi(ticker_name, n):
+    cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    diff = pl.col('tp').diff()
+    lazy = (
+        pl.from_arrow(load_table(ticker_name)).lazy()
+        # 跟 load_data 一樣：轉成數字、丟掉有缺值的列，列數才會對得上
+        .with_columns(pl.col(cols).cast(pl.Float64, strict=False).fill_nan(None))
+        .drop_nulls(cols)
+        .with_columns(((pl.col('High') + pl.col('Low') + pl.col('Close')) / 3).alias('tp'))
+        # 典型價格沒漲的日子 (包含平盤) 都算資金流出，跟 pandas_ta 一樣
+        # 第一天沒有前一天可比 (diff 是 null)，兩邊都是 null，從第 n+1 天才開始有值
+        .with_columns([
+            pl.when(diff > 0).then(pl.col('tp') * pl.col('Volume')).when(diff <= 0).then(0.0).alias('pos_mf'),
+            pl.when(diff > 0).then(0.0).when(diff <= 0).then(pl.col('tp') * pl.col('Volume')).alias('neg_mf'),
+        ])
+        .with_columns([
+            pl.col('pos_mf').rolling_sum(n).alias('gain'),
+            pl.col('neg_mf').rolling_sum(n).alias('loss'),
+        ])
+        # 100 - 100 / (1 + gain/loss) 的等價寫法，loss 為 0 時不會除以零
+        .select((100 * pl.col('gain') / (pl.col('gain') + pl.col('loss'))).alias('MFI'))
+    )
+    return lazy.collect(engine="streaming").get_column('MFI').to_numpy()
+
+# 買賣訊號點也以 (股票, 天數, 門檻) 快取，只留下畫圖需要的陣列，不複製整張 DataFrame
+@st.cache_data
+def signal_arrays(ticker_name, n, buy, sell):
+    mfi_arr = compute_mfi(ticker_name, n)
+    idx = load_data(ticker_name).index.to_numpy()
+    mask_b = mfi_arr < buy
+    mask_s = mfi_arr > sell
+    return idx[mask_b], mfi_arr[mask_b], idx[mask_s], mfi_arr[mask_s]
+
+# 回測結果只跟 (股票, 天數, 門檻) 有關，同一組參數再來一次直接拿快取
+# 只回傳用得到的幾個數字，不回傳整個 stats (裡面有整條權益曲線跟交易明細)
+@st.cache_data(show_spinner=False)
+def run_backtest(ticker_name, n, buy, sell):
+    # 側邊欄的參數用 bt.run() 傳給這一次回測，不去改 class 屬性
+    # (每個連線是不同執行緒，改 class 會讓同時在跑的回測互相蓋掉參數)
+    bt = Backtest(load_data(ticker_name), DashboardStrategy, cash=1_000_000, commission=.001425)
+    stats = bt.run(mfi_period=n, buy_level=buy, sell_level=sell,
+                   mfi_precomputed=compute_mfi(ticker_name, n))
+    return {key: stats[key] for key in ('Win Rate [%]', 'Max. Drawdown [%]', 'Return [%]', '# Trades')}
+
+# K 線只跟 (股票, 顯示天數) 有關，先組好整條 trace 快取起來
+# 只動 MFI 參數時就不用重新驗證、轉換四條 OHLC 陣列
+@st.cache_data
+def ohlc_trace(ticker_name, window):
+    chart_df = load_data(ticker_name).iloc[-window:]
+    return go.Candlestick(x=chart_df.index.to_list(), open=chart_df['Open'].tolist(), high=chart_df['High'].tolist(),
+                          low=chart_df['Low'].tolist(), close=chart_df['Close'].tolist(), name='Price')
+
 df = load_data(ticker)
 if df is None:
     st.error(f"找不到 {ticker} 數據！請先執行 fetch_data.py")
@@ -68,18 +146,13 @@ if df is None:
 # --- 5. 即時運算區 ---
 
 # A. 算指標
-df['MFI'] = ta.mfi(df['High'], df['Low'], df['Close'], df['Volume'], length=mfi_period)
+mfi_values = compute_mfi(ticker, mfi_period)
+df['MFI'] = mfi_values
 last_mfi = df['MFI'].iloc[-1]
 last_price = df['Close'].iloc[-1]
 
 # B. 跑回測 (即時算出勝率與風險)
-# 把側邊欄的參數傳進去
-DashboardStrategy.mfi_period = mfi_period
-DashboardStrategy.buy_level = buy_level
-DashboardStrategy.sell_level = sell_level
-
-bt = Backtest(df, DashboardStrategy, cash=1_000_000, commission=.001425)
-stats = bt.run()
+stats = run_backtest(ticker, mfi_period, buy_level, sell_level)
 
 # 從回測結果抓出我們要的關鍵數據
 win_rate = stats['Win Rate [%]']
@@ -142,21 +215,30 @@ st.markdown("---")
 # --- 區塊三：圖表區 ---
 st.subheader("📈 趨勢與進出點 (Charts)")
 
-# 產生訊號點
-buy_signals = df[df['MFI'] < buy_level]
-sell_signals = df[df['MFI'] > sell_level]
+# 圖表只畫最近 N 天，歷史很長時不用每次都把整段數據送進瀏覽器
+if len(df) > 60:
+    history_window = st.sidebar.slider("圖表顯示天數 (History window)", 60, len(df), min(len(df), 500))
+else:
+    history_window = len(df)
+chart_df = df.iloc[-history_window:]
+chart_start = chart_df.index[0]
+
+# 產生訊號點 (只留下圖表範圍內的)
+buy_x, buy_y, sell_x, sell_y = signal_arrays(ticker, mfi_period, buy_level, sell_level)
+in_window_b = buy_x >= chart_start
+in_window_s = sell_x >= chart_start
 
 fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_width=[0.2, 0.8])
 
 # K 線
-fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], name='Price'), row=1, col=1)
+fig.add_trace(ohlc_trace(ticker, history_window), row=1, col=1)
 
-# MFI 線
-fig.add_trace(go.Scatter(x=df.index, y=df['MFI'], line=dict(color='#b550ff', width=2), name='MFI'), row=2, col=1)
+# MFI 線 (Scattergl 用 WebGL 畫，點多的時候比 SVG 順很多)
+fig.add_trace(go.Scattergl(x=chart_df.index, y=chart_df['MFI'], line=dict(color='#b550ff', width=2), name='MFI'), row=2, col=1)
 
 # 買賣點
-fig.add_trace(go.Scatter(x=buy_signals.index, y=buy_signals['MFI'], mode='markers', marker=dict(color='#00e676', size=10), name='Buy'), row=2, col=1)
-fig.add_trace(go.Scatter(x=sell_signals.index, y=sell_signals['MFI'], mode='markers', marker=dict(color='#ff1744', size=10), name='Sell'), row=2, col=1)
+fig.add_trace(go.Scattergl(x=buy_x[in_window_b], y=buy_y[in_window_b], mode='markers', marker=dict(color='#00e676', size=10), name='Buy'), row=2, col=1)
+fig.add_trace(go.Scattergl(x=sell_x[in_window_s], y=sell_y[in_window_s], mode='markers', marker=dict(color='#ff1744', size=10), name='Sell'), row=2, col=1)
 
 # 警戒線
 fig.add_hrect(y0=sell_level, y1=100, row=2, col=1, fillcolor="red", opacity=0.1, line_width=0)
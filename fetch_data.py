@@ -13,7 +13,17 @@ df = yf.download(stock_id, period="1y", progress=True)
 print("\n--- 數據搬運完成！這是最新的 5 筆資料 ---")
 print(df.tail())
 
-# 4. 把數據存成 CSV 檔，以後不用網路也能跑回測
+# 4. 把數據存成 Parquet 檔，以後不用網路也能跑回測
+# Parquet 是欄式格式，會保留欄位型別，讀取比 CSV 快很多，檔案也小很多
+# 新版 yfinance 的欄位是兩層 (Price, Ticker)，只留第一層的 'Close', 'High'...
+parquet_name = f"{stock_id}.parquet"
+flat = df.copy()
+if isinstance(flat.columns, pd.MultiIndex):
+    flat.columns = flat.columns.get_level_values(0)
+flat.reset_index().to_parquet(parquet_name, compression="snappy")
+print(f"\n✅ 數據已存檔為: {parquet_name}")
+
+# 5. 順便留一份 CSV，想用 Excel 打開看看的時候方便
 file_name = f"{stock_id}_history.csv"
 df.to_csv(file_name)
-print(f"\n✅ 數據已存檔為: {file_name}")
\ No newline at end of file
+print(f"📄 CSV 備份: {file_name}")
\ No newline at end of file
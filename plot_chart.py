@@ -1,10 +1,9 @@
-import pandas as pd
-import pandas_ta as ta
+import polars as pl
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 # 1. 讀取妳算好 MFI 的那個乾淨檔案
-df = pd.read_csv("6944_mfi_calculated.csv", index_col=0, parse_dates=True)
+df = pl.read_csv("6944_mfi_calculated.csv", try_parse_dates=True).to_pandas().set_index('Date')
 
 # 2. 建立畫布 (兩層：上面是 K 線，下面是 MFI)
 fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
@@ -1,13 +1,16 @@
-import pandas as pd
+import polars as pl
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 # 1. 讀取數據
-df = pd.read_csv("2337_mfi_calculated.csv", index_col=0, parse_dates=True)
+df = pl.read_csv("2337_mfi_calculated.csv", try_parse_dates=True).to_pandas().set_index('Date')
 
-# 2. 定義訊號
-buy_signals = df[df['MFI'] < 30]  # 為了讓妳開心，我稍微放寬到 30，讓妳多看幾個綠點
-sell_signals = df[df['MFI'] > 80]
+# 2. 定義訊號 (只用 NumPy 遮罩挑出畫圖要的三個欄位，不複製整張表)
+mfi = df['MFI'].to_numpy()
+idx = df.index.to_numpy()
+close = df['Close'].to_numpy()
+buy_mask = mfi < 30  # 為了讓妳開心，我稍微放寬到 30，讓妳多看幾個綠點
+sell_mask = mfi > 80
 
 # 3. 建立畫布
 fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
@@ -33,12 +36,12 @@ fig.add_trace(go.Scatter(x=df.index, y=df['MFI'],
 
 # B. 買進訊號 (綠點) - 加入 Price 資訊
 fig.add_trace(go.Scatter(
-    x=buy_signals.index, 
-    y=buy_signals['MFI'],
+    x=idx[buy_mask], 
+    y=mfi[buy_mask],
     # 關鍵魔法：把 Price 塞進 customdata
-    customdata=buy_signals[['Close']], 
-    # 顯示格式：<br> 是換行，%{customdata[0]} 就是我們塞進去的股價
-    hovertemplate='<b>Buy Signal</b> 🟢<br>Date: %{x|%Y-%m-%d}<br>MFI: %{y:.1f}<br><b>Price: %{customdata[0]:.1f}</b><extra></extra>',
+    customdata=close[buy_mask], 
+    # 顯示格式：<br> 是換行，%{customdata} 就是我們塞進去的股價
+    hovertemplate='<b>Buy Signal</b> 🟢<br>Date: %{x|%Y-%m-%d}<br>MFI: %{y:.1f}<br><b>Price: %{customdata:.1f}</b><extra></extra>',
     mode='markers',
     marker=dict(symbol='circle', color='#00e676', size=10, line=dict(width=2, color='white')), 
     name='Buy Trigger'
@@ -46,10 +49,10 @@ fig.add_trace(go.Scatter(
 
 # C. 賣出訊號 (紅點) - 加入 Price 資訊
 fig.add_trace(go.Scatter(
-    x=sell_signals.index, 
-    y=sell_signals['MFI'], 
-    customdata=sell_signals[['Close']], # 一樣要把 Price 塞進來
-    hovertemplate='<b>Sell Signal</b> 🔴<br>Date: %{x|%Y-%m-%d}<br>MFI: %{y:.1f}<br><b>Price: %{customdata[0]:.1f}</b><extra></extra>',
+    x=idx[sell_mask], 
+    y=mfi[sell_mask], 
+    customdata=close[sell_mask], # 一樣要把 Price 塞進來
+    hovertemplate='<b>Sell Signal</b> 🔴<br>Date: %{x|%Y-%m-%d}<br>MFI: %{y:.1f}<br><b>Price: %{customdata:.1f}</b><extra></extra>',
     mode='markers',
     marker=dict(symbol='circle', color='#ff1744', size=10, line=dict(width=2, color='white')), 
     name='Sell Trigger'
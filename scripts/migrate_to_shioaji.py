@@ -14,10 +14,13 @@ Usage:
 """
 import sys
 import os
+import sqlite3
 from pathlib import Path
 from datetime import date, timedelta, datetime
 import argparse
+import yfinance as yf
 from dotenv import load_dotenv
+from tqdm import tqdm
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
@@ -30,11 +33,158 @@ from src.infrastructure.database.repository import MarketDataRepository
 from src.application.services.data_service import DataService
 
 
-def setup_providers():
-    """Initialize data providers."""
-    # Load environment
-    load_dotenv(project_root / '.env')
+# Top 100 Taiwan stocks (TWSE 50 + Mid Cap 50)
+_TOP_STOCKS: tuple[str, ...] = (
+    # === Top 50 Blue Chips (TWSE 50) ===
+    "2330.TW",  # TSMC 台積電
+    "2317.TW",  # Hon Hai 鴻海
+    "2454.TW",  # MediaTek 聯發科
+    "2881.TW",  # Fubon Financial 富邦金
+    "2882.TW",  # Cathay Financial 國泰金
+    "2412.TW",  # Chunghwa Telecom 中華電
+    "2891.TW",  # CTBC Financial 中信金
+    "2886.TW",  # Mega Financial 兆豐金
+    "2884.TW",  # E.Sun Financial 玉山金
+    "2303.TW",  # UMC 聯電
+    "1301.TW",  # Formosa Plastics 台塑
+    "1303.TW",  # Nan Ya Plastics 南亞
+    "2308.TW",  # Delta Electronics 台達電
+    "2002.TW",  # China Steel 中鋼
+    "3008.TW",  # LARGAN 大立光
+    "2382.TW",  # Quanta 廣達
+    "2337.TW",  # Macronix 旺宏
+    "6944.TW",  # Zulion 兆聯實業
+    "2357.TW",  # ASUS 華碩
+    "2379.TW",  # Realtek 瑞昱
+    "2327.TW",  # Yageo 國巨
+    "2301.TW",  # Lite-On 光寶科
+    "2395.TW",  # Advantech 研華
+    "3034.TW",  # Novatek 聯詠
+    "2409.TW",  # AU Optronics 友達
+    "3037.TW",  # Unimicron 欣興
+    "2408.TW",  # Nanya Tech 南亞科
+    "2912.TW",  # President Chain 統一超
+    "5880.TW",  # Taiwan Business Bank 合庫金
+    "2885.TW",  # Yuanta Financial 元大金
+    "2883.TW",  # China Development 開發金
+    "2887.TW",  # Taishin Financial 台新金
+    "2890.TW",  # Sinopac Financial 永豐金
+    "2892.TW",  # First Financial 第一金
+    "2880.TW",  # Hua Nan Financial 華南金
+    "2888.TW",  # Shin Kong Financial 新光金
+    "1326.TW",  # Formosa Chemicals 台化
+    "1216.TW",  # Uni-President 統一
+    "2207.TW",  # Hotai Motor 和泰車
+    "2105.TW",  # Cheng Shin Rubber 正新
+    "2801.TW",  # Chang Hwa Bank 彰銀
+    "2353.TW",  # Acer 宏碁
+    "2324.TW",  # Compal 仁寶
+    "2360.TW",  # Kinpo 致伸
+    "2377.TW",  # Microstar 微星
+    "2603.TW",  # Evergreen Marine 長榮海運
+    "2609.TW",  # Yang Ming Marine 陽明
+    "2615.TW",  # Wan Hai Lines 萬海
+    "5269.TW",  # Airtac 祥碩
+    "3231.TW",  # Wistron 緯創
+    
+    # === Mid Cap 50 (High Growth Potential) ===
+    "6505.TW",  # 台塑化 Formosa Petrochemical
+    "2345.TW",  # 智邦 Accton
+    "2347.TW",  # 聯強 Synnex
+    "2356.TW",  # 英業達 Inventec
+    "2352.TW",  # 佳世達 Qisda
+    "2354.TW",  # 鴻準 Foxconn Tech
+    "2201.TW",  # 裕隆 Yulon Motor
+    "2027.TW",  # 大成鋼 Ta Chen Steel
+    "2006.TW",  # 東和鋼鐵 Tung Ho Steel
+    "2059.TW",  # 川湖 Catcher
+    "2049.TW",  # 上銀 Hiwin
+    "4938.TW",  # 和碩 Pegatron
+    "3045.TW",  # 台灣大 Taiwan Mobile
+    "4904.TW",  # 遠傳 Far EasTone
+    "2606.TW",  # 裕民 U-Ming Marine
+    "2376.TW",  # 技嘉 Gigabyte
+    "2504.TW",  # 國產 Kuo Chan
+    "2014.TW",  # 中鴻 China Steel Structure
+    "9904.TW",  # 寶成 Pou Chen
+    "9910.TW",  # 豐泰 Feng Tay
+    "1402.TW",  # 遠東新 Far Eastern New Century
+    "1590.TW",  # 亞德客-KY Airtac
+    "2204.TW",  # 中華 China Motor
+    "2371.TW",  # 大同 Tatung
+    "3481.TW",  # 群創 Innolux
+    "6669.TW",  # 緯穎 Wiwynn
+    "6770.TW",  # 力積電 PSMC
+    "3711.TW",  # 日月光投控 ASE Technology Holding
+    "5871.TW",  # 中租-KY Chailease Holding
+    "9921.TW",  # 巨大 Giant Manufacturing
+    "2618.TW",  # 長榮航 EVA Airways
+    "2610.TW",  # 華航 China Airlines
+    "6415.TW",  # 矽力-KY Silergy
+    "3704.TW",  # 合勤控 ZyXEL
+    "6531.TW",  # 愛普 Epoch
+    "3702.TW",  # 大聯大 WPG Holdings
+    "4919.TW",  # 新唐 Nuvoton
+    "6239.TW",  # 力成 Powertech
+    "8046.TW",  # 南電 Nan Ya PCB
+    "9945.TW",  # 潤泰新 Ruentex Industries
+    "2023.TW",  # 燁輝 Yieh Phui Enterprise
+    "9914.TW",  # 美利達 Merida
+    "2474.TW",  # 可成 Catcher Technology
+    "6116.TW",  # 彩晶 Chunghwa Picture Tubes
+    "8299.TW",  # 群聯 Phison Electronics
+)
+
+
+def prepare_database(db):
+    """Tune the shared connection and make sure symbol lookups are indexed."""
+    conn = db.get_connection()
+    
+    # WAL + synchronous=NORMAL: each save_dataframe commit no longer forces an
+    # fsync, which dominates bulk imports of hundreds of symbols
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    
+    # Lets SELECT DISTINCT symbol be answered from the index alone
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_kline_symbol ON daily_kline(symbol)")
+        conn.commit()
+    except sqlite3.OperationalError:
+        # Fresh database: the repository creates daily_kline on first use
+        pass
+
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def normalize_ohlcv(df):
+    """
+    Bring one ticker's slice of a batch yf.download into the provider's layout.
     
+    Unlike YFinanceProvider.get_historical_data, the raw multi-ticker slice
+    carries Adj Close, a possibly tz-aware index and all-NaN padding rows for
+    days the ticker did not trade. Provider results are saved as-is.
+    
+    Args:
+        df: ``big[symbol]`` slice of a ``group_by='ticker'`` download
+    
+    Returns:
+        DataFrame with Open/High/Low/Close/Volume columns and a naive,
+        sorted, de-duplicated DatetimeIndex named 'Date'
+    """
+    df = df.rename(columns=lambda c: str(c).strip().title())
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+    df = df.dropna(subset=[c for c in ('Close',) if c in df.columns])
+    
+    if getattr(df.index, 'tz', None) is not None:
+        df.index = df.index.tz_localize(None)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df.index.name = 'Date'
+    return df
+
+
+def setup_providers(db):
+    """Initialize data providers."""
     # yfinance provider (for historical data)
     yf_provider = YFinanceProvider()
     yf_provider.connect()
@@ -57,22 +207,26 @@ def setup_providers():
         sj_connected = False
     
     # Database
-    db_path = os.getenv('DATABASE_PATH', 'data/database/market_data.db')
-    db = DatabaseConnection(db_path)
     repository = MarketDataRepository(db)
     
     return yf_provider, sj_provider, sj_connected, repository
 
 
-def bulk_import_historical(symbols: list, yf_provider, repository, years: int = 5):
+def bulk_import_historical(symbols: list, yf_provider, repository, db, years: int = 5, workers: int = 8):
     """
     Bulk import historical data using yfinance.
     
+    Symbols that share a start date are downloaded in one multi-ticker
+    yf.download call; anything missing from the batch is retried through
+    the provider. Database writes stay in the main thread.
+    
     Args:
         symbols: List of stock symbols (e.g., ['2330.TW', '2337.TW'])
-        yf_provider: YFinance provider instance
+        yf_provider: YFinance provider instance (per-symbol fallback)
         repository: Database repository
+        db: Database connection (for the latest-date lookup)
         years: Number of years of historical data to fetch
+        workers: Number of yfinance download threads
     """
     print("\n" + "="*60)
     print(f"📦 BULK IMPORT: {len(symbols)} stocks, {years} years of data")
@@ -84,48 +238,80 @@ def bulk_import_historical(symbols: list, yf_provider, repository, years: int =
     success_count = 0
     failed = []
     
-    for i, symbol in enumerate(symbols, 1):
-        print(f"\n[{i}/{len(symbols)}] {symbol}...")
+    # Decide what each symbol needs before any network I/O
+    try:
+        latest = get_latest_dates(db, symbols)
+    except Exception as e:
+        print(f"⚠️  Could not read latest dates, fetching full history: {e}")
+        latest = {}
+    
+    pending = []
+    for symbol in symbols:
+        last_date = latest.get(symbol)
+        
+        if last_date is None:
+            pending.append((symbol, start_date))
+            continue
         
+        days_old = (date.today() - last_date).days
+        if days_old <= 1:
+            print(f"   ✅ {symbol}: Already up-to-date (last: {last_date})")
+            success_count += 1
+            continue
+        
+        # Only fetch new data (but never more than the requested history)
+        pending.append((symbol, max(last_date + timedelta(days=1), start_date)))
+    
+    # Group by start date so each group is a single multi-ticker request
+    groups = {}
+    for symbol, fetch_start in pending:
+        groups.setdefault(fetch_start, []).append(symbol)
+    
+    results = []
+    for fetch_start, group in groups.items():
+        print(f"   📥 Downloading {len(group)} stocks from {fetch_start}...")
         try:
-            # Check if data already exists
-            existing = repository.get_data(symbol, start_date, end_date)
-            
-            if not existing.empty:
-                last_date = existing.index[-1].date()
-                days_old = (date.today() - last_date).days
-                
-                if days_old <= 1:
-                    print(f"   ✅ Already up-to-date (last: {last_date})")
-                    success_count += 1
-                    continue
-                else:
-                    print(f"   📥 Updating from {last_date}...")
-                    # Only fetch new data
-                    start_date = last_date + timedelta(days=1)
-            else:
-                print(f"   📥 Fetching full history ({years} years)...")
-            
-            # Fetch from yfinance
-            df = yf_provider.get_historical_data(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date,
-                interval='1d'
+            big = yf.download(
+                tickers=" ".join(group),
+                start=fetch_start,
+                end=end_date,
+                interval='1d',
+                group_by='ticker',
+                threads=workers,
+                progress=False
             )
+        except Exception as e:
+            print(f"   ⚠️  Batch download failed, retrying one by one: {e}")
+            big = None
+        
+        for symbol in group:
+            if big is not None and symbol in big.columns.get_level_values(0):
+                results.append((symbol, fetch_start, normalize_ohlcv(big[symbol])))
+            else:
+                results.append((symbol, fetch_start, None))
+    
+    for symbol, fetch_start, df in tqdm(results, desc="💾 Saving", unit="stock"):
+        try:
+            if df is None or df.empty:
+                # Not in the batch result: fall back to the provider
+                df = yf_provider.get_historical_data(
+                    symbol=symbol,
+                    start_date=fetch_start,
+                    end_date=end_date,
+                    interval='1d'
+                )
             
             if df.empty:
-                print(f"   ⚠️  No data returned (might be delisted)")
+                tqdm.write(f"   ⚠️  {symbol}: No data returned (might be delisted)")
                 failed.append(symbol)
                 continue
             
-            # Save to database
+            # Save to database (one transaction per symbol: save_dataframe
+            # commits on its own, so the run cannot be batched from here)
             repository.save_dataframe(df, symbol)
-            print(f"   ✅ Saved {len(df)} rows to database")
             success_count += 1
-            
         except Exception as e:
-            print(f"   ❌ Failed: {e}")
+            tqdm.write(f"   ❌ {symbol}: Failed: {e}")
             failed.append(symbol)
     
     # Summary
@@ -139,7 +325,7 @@ def bulk_import_historical(symbols: list, yf_provider, repository, years: int =
     print()
 
 
-def daily_update_shioaji(symbols: list, sj_provider, repository):
+def daily_update_shioaji(symbols: list, sj_provider, repository, db):
     """
     Daily update using Shioaji (rate-limit friendly).
     
@@ -155,19 +341,23 @@ def daily_update_shioaji(symbols: list, sj_provider, repository):
     success_count = 0
     failed = []
     
+    # One grouped query instead of a range read per symbol
+    try:
+        latest = get_latest_dates(db, symbols)
+    except Exception as e:
+        print(f"⚠️  Could not read latest dates: {e}")
+        latest = {}
+    
     for i, symbol in enumerate(symbols, 1):
         print(f"\n[{i}/{len(symbols)}] {symbol}...")
         
         try:
             # Check if already have today's data
-            existing = repository.get_data(symbol, yesterday, today)
-            
-            if not existing.empty:
-                last_date = existing.index[-1].date()
-                if last_date >= yesterday:
-                    print(f"   ✅ Already up-to-date (last: {last_date})")
-                    success_count += 1
-                    continue
+            last_date = latest.get(symbol)
+            if last_date is not None and last_date >= yesterday:
+                print(f"   ✅ Already up-to-date (last: {last_date})")
+                success_count += 1
+                continue
             
             # Fetch yesterday's data from Shioaji
             print(f"   📥 Fetching {yesterday}...")
@@ -202,144 +392,68 @@ def daily_update_shioaji(symbols: list, sj_provider, repository):
     print()
 
 
-def get_all_stocks_from_db() -> list:
+def get_all_stocks_from_db(db) -> list:
     """Get all unique stock symbols from the database."""
     try:
-        db_path = os.getenv('DATABASE_PATH', 'data/database/market_data.db')
-        db = DatabaseConnection(db_path)
-        
         conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT symbol FROM daily_kline ORDER BY symbol")
-        symbols = [row[0] for row in cursor.fetchall()]
-        
-        db.close()
-        return symbols
+        return [row[0] for row in cursor.fetchall()]
     except Exception as e:
         print(f"⚠️  Could not fetch stocks from database: {e}")
         return []
 
 
+def get_latest_dates(db, symbols: list) -> dict:
+    """
+    Get the most recent stored date for each symbol in one grouped query.
+    
+    Args:
+        db: Database connection
+        symbols: List of stock symbols
+        
+    Returns:
+        Dict of symbol -> date (symbols without data are omitted)
+    """
+    conn = db.get_connection()
+    latest = {}
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(symbols), 500):
+        chunk = symbols[i:i + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT symbol, MAX(date) FROM daily_kline WHERE symbol IN ({placeholders}) GROUP BY symbol",
+            chunk
+        ).fetchall()
+        for symbol, last in rows:
+            if last is not None:
+                latest[symbol] = date.fromisoformat(str(last)[:10])
+    return latest
+
+
 def get_taiwan_top_stocks(n: int = 100) -> list:
     """Get list of top N Taiwan stocks by market cap."""
-    # Top 100 Taiwan stocks (TWSE 50 + Mid Cap 50)
-    top_stocks = [
-        # === Top 50 Blue Chips (TWSE 50) ===
-        "2330.TW",  # TSMC 台積電
-        "2317.TW",  # Hon Hai 鴻海
-        "2454.TW",  # MediaTek 聯發科
-        "2881.TW",  # Fubon Financial 富邦金
-        "2882.TW",  # Cathay Financial 國泰金
-        "2412.TW",  # Chunghwa Telecom 中華電
-        "2891.TW",  # CTBC Financial 中信金
-        "2886.TW",  # Mega Financial 兆豐金
-        "2884.TW",  # E.Sun Financial 玉山金
-        "2303.TW",  # UMC 聯電
-        "1301.TW",  # Formosa Plastics 台塑
-        "1303.TW",  # Nan Ya Plastics 南亞
-        "2308.TW",  # Delta Electronics 台達電
-        "2002.TW",  # China Steel 中鋼
-        "3008.TW",  # LARGAN 大立光
-        "2382.TW",  # Quanta 廣達
-        "2337.TW",  # Macronix 旺宏
-        "6944.TW",  # Zulion 兆聯實業
-        "2357.TW",  # ASUS 華碩
-        "2379.TW",  # Realtek 瑞昱
-        "2327.TW",  # Yageo 國巨
-        "2301.TW",  # Lite-On 光寶科
-        "2395.TW",  # Advantech 研華
-        "3034.TW",  # Novatek 聯詠
-        "2409.TW",  # AU Optronics 友達
-        "3037.TW",  # Unimicron 欣興
-        "2408.TW",  # Nanya Tech 南亞科
-        "2912.TW",  # President Chain 統一超
-        "5880.TW",  # Taiwan Business Bank 合庫金
-        "2885.TW",  # Yuanta Financial 元大金
-        "2883.TW",  # China Development 開發金
-        "2887.TW",  # Taishin Financial 台新金
-        "2890.TW",  # Sinopac Financial 永豐金
-        "2892.TW",  # First Financial 第一金
-        "2880.TW",  # Hua Nan Financial 華南金
-        "2888.TW",  # Shin Kong Financial 新光金
-        "1326.TW",  # Formosa Chemicals 台化
-        "1216.TW",  # Uni-President 統一
-        "2207.TW",  # Hotai Motor 和泰車
-        "2105.TW",  # Cheng Shin Rubber 正新
-        "2801.TW",  # Chang Hwa Bank 彰銀
-        "2353.TW",  # Acer 宏碁
-        "2324.TW",  # Compal 仁寶
-        "2360.TW",  # Kinpo 致伸
-        "2377.TW",  # Microstar 微星
-        "2603.TW",  # Evergreen Marine 長榮海運
-        "2609.TW",  # Yang Ming Marine 陽明
-        "2615.TW",  # Wan Hai Lines 萬海
-        "5269.TW",  # Airtac 祥碩
-        "3231.TW",  # Wistron 緯創
-        
-        # === Mid Cap 50 (High Growth Potential) ===
-        "6505.TW",  # 台塑化 Formosa Petrochemical
-        "2345.TW",  # 智邦 Accton
-        "2347.TW",  # 聯強 Synnex
-        "2356.TW",  # 英業達 Inventec
-        "2352.TW",  # 佳世達 Qisda
-        "2354.TW",  # 鴻準 Foxconn Tech
-        "2201.TW",  # 裕隆 Yulon Motor
-        "2027.TW",  # 大成鋼 Ta Chen Steel
-        "2006.TW",  # 東和鋼鐵 Tung Ho Steel
-        "2059.TW",  # 川湖 Catcher
-        "2049.TW",  # 上銀 Hiwin
-        "4938.TW",  # 和碩 Pegatron
-        "3045.TW",  # 台灣大 Taiwan Mobile
-        "4904.TW",  # 遠傳 Far EasTone
-        "2606.TW",  # 裕民 U-Ming Marine
-        "2376.TW",  # 技嘉 Gigabyte
-        "2504.TW",  # 國產 Kuo Chan
-        "2014.TW",  # 中鴻 China Steel Structure
-        "9904.TW",  # 寶成 Pou Chen
-        "9910.TW",  # 豐泰 Feng Tay
-        "1402.TW",  # 遠東新 Far Eastern New Century
-        "1590.TW",  # 亞德客-KY Airtac
-        "2204.TW",  # 中華 China Motor
-        "2371.TW",  # 大同 Tatung
-        "3481.TW",  # 群創 Innolux
-        "6669.TW",  # 緯穎 Wiwynn
-        "6770.TW",  # 力積電 PSMC
-        "3711.TW",  # 日月光投控 ASE Technology Holding
-        "5871.TW",  # 中租-KY Chailease Holding
-        "9921.TW",  # 巨大 Giant Manufacturing
-        "2618.TW",  # 長榮航 EVA Airways
-        "2610.TW",  # 華航 China Airlines
-        "6415.TW",  # 矽力-KY Silergy
-        "3704.TW",  # 合勤控 ZyXEL
-        "6531.TW",  # 愛普 Epoch
-        "3702.TW",  # 大聯大 WPG Holdings
-        "4919.TW",  # 新唐 Nuvoton
-        "6239.TW",  # 力成 Powertech
-        "2603.TW",  # 長榮 Evergreen
-        "8046.TW",  # 南電 Nan Ya PCB
-        "2609.TW",  # 陽明 Yang Ming
-        "2615.TW",  # 萬海 Wan Hai
-        "9945.TW",  # 潤泰新 Ruentex Industries
-        "2023.TW",  # 燁輝 Yieh Phui Enterprise
-        "1303.TW",  # 南亞 Nan Ya Plastics
-        "9914.TW",  # 美利達 Merida
-        "2474.TW",  # 可成 Catcher Technology
-        "6116.TW",  # 彩晶 Chunghwa Picture Tubes
-        "8299.TW",  # 群聯 Phison Electronics
-    ]
-    return top_stocks[:n]
+    return list(_TOP_STOCKS[:n])
 
 
 def main():
     parser = argparse.ArgumentParser(description='Migrate data from yfinance to Shioaji')
     parser.add_argument('--stocks', nargs='+', help='List of stock symbols (e.g., 2330.TW 2337.TW)')
     parser.add_argument('--all-taiwan', action='store_true', help='Fetch top Taiwan stocks (use --count to specify how many)')
-    parser.add_argument('--count', type=int, default=50, help='Number of stocks to import with --all-taiwan (default: 50, max: 100)')
+    parser.add_argument('--count', type=int, default=50, help=f'Number of stocks to import with --all-taiwan (default: 50, max: {len(_TOP_STOCKS)})')
     parser.add_argument('--update', action='store_true', help='Daily update mode (use Shioaji)')
     parser.add_argument('--years', type=int, default=5, help='Years of historical data (default: 5)')
     
     args = parser.parse_args()
     
+    # Load environment
+    load_dotenv(project_root / '.env')
+    
+    # One database connection for the whole run
+    db_path = os.getenv('DATABASE_PATH', 'data/database/market_data.db')
+    db = DatabaseConnection(db_path)
+    prepare_database(db)
+    
     # Determine stock list
     if args.stocks:
         symbols = args.stocks
@@ -347,7 +461,7 @@ def main():
         symbols = get_taiwan_top_stocks(args.count)
     elif args.update:
         # Update mode without specific stocks - update ALL stocks in database
-        symbols = get_all_stocks_from_db()
+        symbols = get_all_stocks_from_db(db)
         if not symbols:
             print("⚠️  No stocks found in database. Using default stocks.")
             symbols = ["6944.TW", "2337.TW", "2330.TW"]
@@ -364,24 +478,27 @@ def main():
     print("="*60)
     
     # Setup
-    yf_provider, sj_provider, sj_connected, repository = setup_providers()
+    yf_provider, sj_provider, sj_connected, repository = setup_providers(db)
     
     # Execute based on mode
     if args.update:
         # Daily update mode - use Shioaji if available
         if sj_connected:
-            daily_update_shioaji(symbols, sj_provider, repository)
+            daily_update_shioaji(symbols, sj_provider, repository, db)
         else:
             print("\n⚠️  Shioaji not connected, using yfinance fallback...")
-            bulk_import_historical(symbols, yf_provider, repository, years=1)
+            bulk_import_historical(symbols, yf_provider, repository, db, years=1)
     else:
         # Bulk import mode - use yfinance
-        bulk_import_historical(symbols, yf_provider, repository, years=args.years)
+        bulk_import_historical(symbols, yf_provider, repository, db, years=args.years)
     
     # Cleanup
     yf_provider.disconnect()
     if sj_connected:
         sj_provider.disconnect()
+    # Closing checkpoints the WAL back into market_data.db (the CI artifact
+    # only uploads the main database file)
+    db.close()
     
     print("\n✅ Migration complete!")
     print("\n📝 Next steps:")
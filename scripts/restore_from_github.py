@@ -16,53 +16,107 @@ import os
 import sys
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import zipfile
+import zlib
 import shutil
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 
-def get_latest_artifact(repo_owner, repo_name, artifact_name, token):
+# Artifacts larger than this are fetched as parallel byte ranges
+PARALLEL_MIN_SIZE = 64 * 1024 * 1024
+# 1 MiB per read/write: far fewer syscalls than 8 KiB for multi-hundred-MB pulls
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+COPY_BUFFER_SIZE = 1 << 20
+# Parallel range requests for large artifacts (one pooled connection each)
+DOWNLOAD_STRIPES = 4
+DB_MEMBER = "market_data.db"
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+EXTRACT_WORKERS = 8
+# What a corrupt or truncated artifact raises while being extracted
+EXTRACT_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+ARTIFACTS_PER_PAGE = 100
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def create_session(token):
+    """
+    Create one pooled, retrying HTTP session for all GitHub calls.
+    
+    Args:
+        token: GitHub personal access token
+    
+    Returns:
+        requests.Session with auth headers set
+    """
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json",
+        "Accept-Encoding": "gzip, deflate"
+    })
+    adapter = HTTPAdapter(
+        pool_connections=DOWNLOAD_STRIPES,
+        pool_maxsize=DOWNLOAD_STRIPES,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504))
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def get_latest_artifact(session, repo_owner, repo_name, artifact_name):
     """
     Get the latest artifact from GitHub Actions.
     
     Args:
+        session: Session from create_session()
         repo_owner: GitHub username
         repo_name: Repository name
         artifact_name: Name of the artifact (e.g., 'market-database')
-        token: GitHub personal access token
     
     Returns:
         Download URL for the artifact
     """
     url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/actions/artifacts"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
     
     print(f"🔍 Fetching artifacts from {repo_owner}/{repo_name}...")
-    response = requests.get(url, headers=headers)
+    # Filter by name server-side; only page further while results get newer
+    latest = None
+    page = 1
+    while True:
+        response = session.get(
+            url,
+            params={'name': artifact_name, 'per_page': ARTIFACTS_PER_PAGE, 'page': page}
+        )
+        
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch artifacts: {response.status_code}")
+            print(f"   Response: {response.text}")
+            return None
+        
+        data = response.json()
+        matching = [a for a in data.get('artifacts', []) if a['name'] == artifact_name]
+        if not matching:
+            break
+        
+        newest = max(matching, key=lambda a: a['created_at'])
+        if latest is not None and newest['created_at'] <= latest['created_at']:
+            break
+        latest = newest
+        
+        if page * ARTIFACTS_PER_PAGE >= data.get('total_count', 0):
+            break
+        page += 1
     
-    if response.status_code != 200:
-        print(f"❌ Failed to fetch artifacts: {response.status_code}")
-        print(f"   Response: {response.text}")
-        return None
-    
-    data = response.json()
-    artifacts = data.get('artifacts', [])
-    
-    # Filter for the specific artifact name
-    matching = [a for a in artifacts if a['name'] == artifact_name]
-    
-    if not matching:
+    if latest is None:
         print(f"❌ No artifacts found with name '{artifact_name}'")
         return None
     
-    # Sort by created_at to get the latest
-    matching.sort(key=lambda x: x['created_at'], reverse=True)
-    latest = matching[0]
-    
     print(f"✅ Found latest artifact:")
     print(f"   Name: {latest['name']}")
     print(f"   Size: {latest['size_in_bytes'] / 1024 / 1024:.2f} MB")
@@ -71,76 +125,391 @@ def get_latest_artifact(repo_owner, repo_name, artifact_name, token):
     return latest['archive_download_url']
 
 
-def download_artifact(download_url, output_path, token):
+def _probe_ranges(session, download_url):
     """
-    Download artifact from GitHub.
+    Follow the artifact redirect and check whether the host serves ranges.
+    
+    A strong ETag is required too: every stripe sends it as If-Range, so
+    stripes from two versions of the artifact can never be mixed.
     
     Args:
+        session: Session from create_session()
+        download_url: Artifact archive URL
+    
+    Returns:
+        Tuple of (final_url, size, etag), or (None, 0, None) if ranges
+        aren't supported
+    """
+    try:
+        response = session.head(download_url, allow_redirects=True)
+    except requests.RequestException:
+        return None, 0, None
+    
+    etag = response.headers.get('ETag')
+    if (response.status_code != 200 or response.headers.get('Accept-Ranges') != 'bytes'
+            or not etag or etag.startswith('W/')):
+        return None, 0, None
+    return response.url, int(response.headers.get('Content-Length', 0)), etag
+
+
+def _download_ranges(session, url, size, etag, archive):
+    """
+    Fetch url in DOWNLOAD_STRIPES parallel byte ranges into archive (a file).
+    
+    Each stripe is written at its own offset with os.pwrite, so no stripe
+    waits for another and nothing is reassembled afterwards. Stripes are
+    conditional on the probed ETag; any answer other than a 206 for exactly
+    the requested range (e.g. a 200 because the artifact changed) aborts.
+    """
+    fd = archive.fileno()
+    os.ftruncate(fd, size)
+    stripe = -(-size // DOWNLOAD_STRIPES)
+    
+    def fetch(start):
+        end = min(start + stripe, size) - 1
+        # The redirect target is a pre-signed URL: GitHub auth must not follow
+        response = session.get(
+            url,
+            headers={
+                'Range': f'bytes={start}-{end}',
+                'If-Range': etag,
+                'Authorization': None,
+                'Accept-Encoding': 'identity'
+            },
+            stream=True
+        )
+        if response.status_code != 206:
+            raise IOError(f"range {start}-{end} returned {response.status_code}")
+        content_range = response.headers.get('Content-Range')
+        if content_range != f'bytes {start}-{end}/{size}':
+            raise IOError(f"range {start}-{end} answered with {content_range!r}")
+        
+        offset = start
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            view = memoryview(chunk)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                offset += written
+                view = view[written:]
+        if offset != end + 1:
+            raise IOError(f"range {start}-{end} ended early at {offset}")
+    
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_STRIPES) as pool:
+        list(pool.map(fetch, range(0, size, stripe)))
+
+
+def download_artifact(session, download_url, zip_path):
+    """
+    Download artifact from GitHub, resuming a previously interrupted run.
+    
+    Bytes land in ``<zip_path>.part``. If an earlier run left one behind,
+    only the rest is requested (Range + If-Range on the saved ETag, so a
+    changed artifact restarts from zero). Large fresh downloads are
+    fetched as parallel byte ranges when the storage host supports it.
+    
+    Args:
+        session: Session from create_session()
         download_url: URL to download from
-        output_path: Path to save the downloaded file
-        token: GitHub personal access token
+        zip_path: Where the finished zip should end up
+    
+    Returns:
+        zip_path on success, or None on failure
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+    zip_path = Path(zip_path)
+    part_path = zip_path.with_name(zip_path.name + '.part')
+    etag_path = zip_path.with_name(zip_path.name + '.etag')
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
     
     print(f"📥 Downloading artifact...")
-    response = requests.get(download_url, headers=headers, stream=True)
     
-    if response.status_code != 200:
+    existing = part_path.stat().st_size if part_path.exists() else 0
+    etag = etag_path.read_text().strip() if existing and etag_path.exists() else None
+    
+    if not etag and hasattr(os, 'pwrite'):
+        url, size, range_etag = _probe_ranges(session, download_url)
+        if url and size > PARALLEL_MIN_SIZE:
+            try:
+                with open(part_path, 'wb') as f:
+                    _download_ranges(session, url, size, range_etag, f)
+            except (IOError, requests.RequestException) as e:
+                print(f"⚠️  Parallel download failed ({e}), retrying as one stream")
+            else:
+                os.replace(part_path, zip_path)
+                print(f"✅ Downloaded {size / 1024 / 1024:.2f} MB ({DOWNLOAD_STRIPES} streams)")
+                return zip_path
+    
+    headers = {'Accept-Encoding': 'identity'}
+    if etag:
+        headers.update({'Range': f'bytes={existing}-', 'If-Range': etag})
+        print(f"⏯️  Resuming from {existing / 1024 / 1024:.2f} MB")
+    response = session.get(download_url, headers=headers, stream=True)
+    if response.status_code == 416:
+        # The .part is already as long as (or longer than) the artifact
+        response = session.get(download_url, headers={'Accept-Encoding': 'identity'}, stream=True)
+    
+    if response.status_code == 206:
+        mode = 'ab'
+    elif response.status_code == 200:
+        # Fresh start (or the server ignored the range): remember the ETag
+        mode = 'wb'
+        if response.headers.get('ETag'):
+            etag_path.write_text(response.headers['ETag'])
+        elif etag_path.exists():
+            etag_path.unlink()
+    else:
         print(f"❌ Failed to download: {response.status_code}")
-        return False
+        return None
     
-    with open(output_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    try:
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+    except requests.RequestException as e:
+        print(f"❌ Download interrupted: {e}")
+        print(f"   Run the script again to resume from {part_path}")
+        return None
     
-    print(f"✅ Downloaded to {output_path}")
-    return True
+    os.replace(part_path, zip_path)
+    if etag_path.exists():
+        etag_path.unlink()
+    
+    print(f"✅ Downloaded {zip_path.stat().st_size / 1024 / 1024:.2f} MB")
+    return zip_path
 
 
-def extract_and_restore(zip_path, db_path):
+def _clone_file(src, dst):
+    """
+    Copy-on-write clone src to dst (Btrfs/XFS via FICLONE, APFS via clonefile).
+    
+    Returns:
+        True if the clone succeeded, False if the filesystem can't do it
+    """
+    if sys.platform == 'darwin':
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    
+    if sys.platform.startswith('linux'):
+        import fcntl
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+        shutil.copystat(src, dst)
+        return True
+    
+    return False
+
+
+def _copy_file(src, dst):
+    """
+    Copy src to dst in the kernel where possible, else in 1 MiB chunks.
+    
+    os.copy_file_range (Linux) keeps the data out of userspace and lets
+    the filesystem share extents; elsewhere copyfileobj uses a 1 MiB buffer.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        copied = False
+        if hasattr(os, 'copy_file_range'):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                copied = remaining == 0
+            except OSError:
+                # e.g. EXDEV on older kernels: restart from the beginning
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        if not copied:
+            shutil.copyfileobj(fsrc, fdst, length=COPY_BUFFER_SIZE)
+    shutil.copystat(src, dst)
+
+
+def backup_database(db_path, backup_path):
+    """
+    Move the existing database aside, copying only as a last resort.
+    
+    Tries an O(1) rename first, then a reflink clone, then a full copy.
+    
+    Args:
+        db_path: Existing database file
+        backup_path: Where the backup should end up
+    """
+    try:
+        os.rename(db_path, backup_path)
+        return
+    except OSError:
+        pass
+    
+    if not _clone_file(db_path, backup_path):
+        _copy_file(db_path, backup_path)
+
+
+def _extract_member(zip_ref, info, dest):
+    """Stream one zip member to dest."""
+    with zip_ref.open(info) as src, open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length=COPY_BUFFER_SIZE)
+
+
+def _extract_all(archive, db_path, targets):
+    """
+    Extract the database members of archive to ``<target>.restoring`` files.
+    
+    ``targets`` is filled with (ZipInfo, target path) pairs before anything
+    is written, so the caller can clean up if extraction raises. It stays
+    empty if the archive has no database member.
+    """
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        # Find the database file (plus sidecars that belong next to it)
+        members = [
+            info for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.startswith(DB_MEMBER)
+        ]
+        if not any(info.filename == DB_MEMBER for info in members):
+            return
+        
+        # Restore: write next to the targets, then swap them in with a rename
+        print(f"♻️  Restoring database to {db_path}")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        targets.extend(
+            (info, f"{db_path}{info.filename[len(DB_MEMBER):]}")
+            for info in members
+        )
+        # ZipFile serializes reads of the shared handle, so one is enough;
+        # decompression and writes still overlap across members.
+        # Each member's CRC-32 is checked as it streams (BadZipFile on
+        # mismatch), so integrity costs no second read of the database.
+        workers = min(EXTRACT_WORKERS, os.cpu_count() or 1, len(targets))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(
+                lambda t: _extract_member(zip_ref, t[0], f"{t[1]}.restoring"),
+                targets
+            ))
+
+
+def extract_and_restore(archive, db_path):
     """
     Extract database from zip and restore it.
     
+    The database and any sidecar members (``market_data.db-wal`` etc.) are
+    streamed straight from the archive into sibling files, in parallel when
+    there is more than one, then renamed over their targets; there is no
+    intermediate extract directory and no second full copy.
+    
     Args:
-        zip_path: Path to the downloaded zip file
+        archive: Path of the downloaded zip
         db_path: Path where to restore the database
     """
-    # Create backup of existing database
-    if os.path.exists(db_path):
-        backup_path = f"{db_path}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        print(f"💾 Backing up existing database to {backup_path}")
-        shutil.copy2(db_path, backup_path)
-    
-    # Extract
     print(f"📦 Extracting database...")
-    temp_dir = Path(zip_path).parent / "temp_extract"
-    temp_dir.mkdir(exist_ok=True)
-    
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(temp_dir)
+    targets = []
+    try:
+        _extract_all(archive, db_path, targets)
+    except BaseException as e:
+        # Never leave half-written members behind, whatever went wrong
+        for _, target in targets:
+            if os.path.exists(f"{target}.restoring"):
+                os.remove(f"{target}.restoring")
+        if not isinstance(e, EXTRACT_ERRORS):
+            raise
+        print(f"❌ Artifact is corrupt, existing database left untouched: {e}")
+        return False
     
-    # Find the database file
-    db_file = temp_dir / "market_data.db"
-    if not db_file.exists():
+    if not targets:
         print(f"❌ Database file not found in artifact")
-        shutil.rmtree(temp_dir)
         return False
     
-    # Restore
-    print(f"♻️  Restoring database to {db_path}")
-    shutil.copy2(db_file, db_path)
+    # Back up the existing database only once the new one is safely on disk
+    if os.path.exists(db_path):
+        backup_path = f"{db_path}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        print(f"💾 Backing up existing database to {backup_path}")
+        backup_database(db_path, backup_path)
+        # Stale WAL/SHM files must follow the old database, not meet the new one
+        for suffix in SQLITE_SIDECARS:
+            if os.path.exists(f"{db_path}{suffix}"):
+                os.replace(f"{db_path}{suffix}", f"{backup_path}{suffix}")
     
-    # Cleanup
-    shutil.rmtree(temp_dir)
-    os.remove(zip_path)
+    for _, target in targets:
+        os.replace(f"{target}.restoring", target)
     
     print(f"✅ Database restored successfully!")
     return True
 
 
+def prepare_database(db_path):
+    """
+    Prime the restored database for the dashboard's read-heavy workload.
+    
+    WAL mode and the ANALYZE statistics persist in the file. temp_store and
+    mmap_size are per-connection, so here they only speed up ANALYZE.
+    page_size is not set: it cannot change once the database is in WAL mode.
+    
+    Args:
+        db_path: Path of the restored database
+    """
+    import sqlite3
+    print(f"⚙️  Tuning database (WAL + ANALYZE)...")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            ANALYZE;
+        """)
+    finally:
+        conn.close()
+
+
+def verify_database(db_path):
+    """
+    Count stocks and rows in the restored database without a full scan.
+    
+    Distinct symbols come from a GROUP BY that SQLite can answer from the
+    symbol index; the row count comes from sqlite_stat1 when ANALYZE has
+    populated it, falling back to COUNT(*) otherwise.
+    
+    Args:
+        db_path: Path of the restored database
+    
+    Returns:
+        Tuple of (stocks, rows)
+    """
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM daily_kline GROUP BY symbol)"
+        )
+        stocks = cursor.fetchone()[0]
+        
+        rows = None
+        try:
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = 'daily_kline' LIMIT 1"
+            )
+            stat = cursor.fetchone()
+            if stat:
+                rows = int(stat[0].split()[0])
+        except sqlite3.OperationalError:
+            pass  # No sqlite_stat1 until ANALYZE has run
+        
+        if rows is None:
+            cursor.execute("SELECT COUNT(*) FROM daily_kline")
+            rows = cursor.fetchone()[0]
+    finally:
+        conn.close()
+    
+    return stocks, rows
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Restore database from GitHub Actions artifacts'
@@ -200,33 +569,39 @@ def main():
     print("🔄 GitHub Actions Database Restore")
     print("="*60)
     
+    session = create_session(args.token)
+    
     # Get latest artifact
     download_url = get_latest_artifact(
+        session,
         args.owner,
         args.repo,
-        args.artifact,
-        args.token
+        args.artifact
     )
     
     if not download_url:
         sys.exit(1)
     
     # Download
-    temp_zip = Path(args.output).parent / f"{args.artifact}.zip"
-    if not download_artifact(download_url, temp_zip, args.token):
+    zip_path = download_artifact(
+        session,
+        download_url,
+        Path(args.output).parent / f"{args.artifact}.zip"
+    )
+    if zip_path is None:
         sys.exit(1)
     
     # Extract and restore
-    if not extract_and_restore(temp_zip, args.output):
+    try:
+        restored = extract_and_restore(zip_path, args.output)
+    finally:
+        os.remove(zip_path)
+    if not restored:
         sys.exit(1)
     
-    # Verify
-    import sqlite3
-    conn = sqlite3.connect(args.output)
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(DISTINCT symbol) as stocks, COUNT(*) as rows FROM daily_kline")
-    stocks, rows = cursor.fetchone()
-    conn.close()
+    # Tune, then verify against the fresh statistics
+    prepare_database(args.output)
+    stocks, rows = verify_database(args.output)
     
     print("\n" + "="*60)
     print("📊 Restored Database Stats")
@@ -3,7 +3,9 @@ Main Streamlit Dashboard Application.
 
 This is the refactored dashboard with clean separation of concerns.
 """
+import os
 import sys
+import traceback
 from pathlib import Path
 
 # Add src to Python path
@@ -17,9 +19,11 @@ import numpy as np
 if not hasattr(np, 'bool8'):
     np.bool8 = np.bool_
 
-from src.presentation.dashboard.components.charts import create_price_mfi_chart, create_price_mfi_rsi_chart
+from src.presentation.dashboard.components.charts import (
+    MAX_CANDLES, create_price_mfi_chart, create_price_mfi_rsi_chart
+)
 from src.presentation.dashboard.components.metrics import display_performance_metrics, display_signal_card
-from src.presentation.dashboard.components.controls import create_sidebar_controls
+from src.presentation.dashboard.components.controls import create_sidebar_controls, stock_metadata
 
 from src.application.services.data_service import DataService
 from src.application.services.backtest_service import BacktestService
@@ -28,6 +32,12 @@ from src.infrastructure.data_providers.yfinance_provider import YFinanceProvider
 from src.infrastructure.database.connection import get_database
 from src.infrastructure.database.repository import MarketDataRepository
 from src.core.indicators.mfi import MFI
+from src.core.indicators.rsi import RSI
+
+# Importing the strategy modules registers them with the registry (once)
+import src.core.strategies.registry as registry_module
+import src.core.strategies.mfi_hunter
+import src.core.strategies.rsi_mfi_consensus
 
 @st.cache_resource
 def initialize_services():
@@ -46,6 +56,80 @@ def initialize_services():
     return data_service, backtest_service
 
 
+def _data_key(df):
+    """Cheap identity for a price frame: row count plus last bar date."""
+    return len(df), df.index[-1]
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def compute_mfi(_df, symbol, data_key, mfi_period):
+    """
+    Calculate MFI for a price frame, memoized across reruns.
+    
+    ``_df`` is left out of the cache key; ``symbol`` and ``data_key``
+    identify it instead, so hashing the whole frame is skipped.
+    
+    Args:
+        _df: OHLCV DataFrame
+        symbol: Stock symbol the frame belongs to
+        data_key: Result of ``_data_key(_df)``
+        mfi_period: MFI lookback period
+        
+    Returns:
+        MFI ndarray aligned to ``_df``
+    """
+    # Thresholds only affect signals, not the series, so keep them out of the key
+    mfi_indicator = MFI(period=mfi_period)
+    return np.asarray(mfi_indicator.calculate(_df), dtype=float)
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def compute_rsi(_df, symbol, data_key, rsi_period):
+    """
+    Calculate RSI for a price frame, memoized across reruns.
+    
+    Args:
+        _df: OHLCV DataFrame
+        symbol: Stock symbol the frame belongs to
+        data_key: Result of ``_data_key(_df)``
+        rsi_period: RSI lookback period
+        
+    Returns:
+        RSI ndarray aligned to ``_df``
+    """
+    rsi_indicator = RSI(period=rsi_period)
+    return np.asarray(rsi_indicator.calculate(_df), dtype=float)
+
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def run_backtest(_backtest_service, _data_service, symbol, data_key,
+                 strategy_name, strategy_params, cash, commission):
+    """
+    Run a backtest, memoized on symbol, data version and parameters.
+    
+    Args:
+        _backtest_service: BacktestService (not hashed)
+        _data_service: DataService (not hashed)
+        symbol: Stock symbol
+        data_key: Result of ``_data_key`` for the symbol's frame
+        strategy_name: Registered strategy name
+        strategy_params: Strategy parameters as a tuple of (name, value) pairs
+        cash: Initial capital
+        commission: Commission rate
+        
+    Returns:
+        Results dict from RunBacktestUseCase
+    """
+    use_case = RunBacktestUseCase(_backtest_service, _data_service)
+    return use_case.execute(
+        symbol=symbol,
+        strategy_name=strategy_name,
+        strategy_params=dict(strategy_params),
+        cash=cash,
+        commission=commission
+    )
+
+
 def main():
     """Main dashboard application."""
     st.set_page_config(
@@ -54,16 +138,12 @@ def main():
         page_icon="💎"
     )
     
-    # Force reload strategy registry to ensure new strategies are loaded
-    import importlib
-    import src.core.strategies.registry as registry_module
-    import src.core.strategies.mfi_hunter
-    import src.core.strategies.rsi_mfi_consensus
-    
-    # Reload all strategy modules
-    importlib.reload(src.core.strategies.mfi_hunter)
-    importlib.reload(src.core.strategies.rsi_mfi_consensus)
-    importlib.reload(registry_module)
+    # Dev only: pick up strategy edits without restarting streamlit
+    if os.environ.get("DINDIN_DEV_RELOAD"):
+        import importlib
+        importlib.reload(src.core.strategies.mfi_hunter)
+        importlib.reload(src.core.strategies.rsi_mfi_consensus)
+        importlib.reload(registry_module)
     
     # Initialize services
     data_service, backtest_service = initialize_services()
@@ -83,8 +163,7 @@ def main():
     commission_rate = controls['commission']
     
     # Main title with stock info
-    from src.utils.stock_list import load_stock_metadata
-    metadata = load_stock_metadata()
+    metadata = stock_metadata()
     stock_name = metadata.get(symbol, symbol.replace('.TW', ''))
     
     st.title(f"🚀 {stock_name}")
@@ -98,28 +177,19 @@ def main():
             st.error(f"找不到 {symbol} 數據！請先執行數據抓取。")
             return
         
+        data_key = _data_key(df)
+        
         # Calculate indicators based on selected strategy
         try:
-            from src.core.indicators.rsi import RSI
-            
-            mfi_indicator = MFI(
-                period=mfi_period,
-                buy_threshold=buy_level,
-                sell_threshold=sell_level
-            )
-            df['MFI'] = mfi_indicator.calculate(df)
-            last_mfi = df['MFI'].iloc[-1]
+            mfi_values = compute_mfi(df, symbol, data_key, mfi_period)
+            last_mfi = mfi_values[-1]
             
             # Calculate RSI if using consensus strategy
             if strategy_name == "rsi_mfi_consensus":
-                rsi_indicator = RSI(
-                    period=rsi_period,
-                    overbought=rsi_overbought,
-                    oversold=rsi_oversold
-                )
-                df['RSI'] = rsi_indicator.calculate(df)
-                last_rsi = df['RSI'].iloc[-1]
+                rsi_values = compute_rsi(df, symbol, data_key, rsi_period)
+                last_rsi = rsi_values[-1]
             else:
+                rsi_values = None
                 last_rsi = None
                 
         except Exception as e:
@@ -129,12 +199,8 @@ def main():
             st.write("Debug - DataFrame head:", df.head())
             return
         
-        last_price = df['Close'].iloc[-1]
-        
         # Run backtest for performance metrics
         try:
-            use_case = RunBacktestUseCase(backtest_service, data_service)
-            
             # Build strategy parameters based on selection
             if strategy_name == "mfi_hunter":
                 strategy_params = {
@@ -154,16 +220,18 @@ def main():
             else:
                 strategy_params = {}
             
-            backtest_results = use_case.execute(
-                symbol=symbol,
-                strategy_name=strategy_name,
-                strategy_params=strategy_params,
-                cash=initial_capital,
-                commission=commission_rate
+            backtest_results = run_backtest(
+                backtest_service,
+                data_service,
+                symbol,
+                data_key,
+                strategy_name,
+                tuple(sorted(strategy_params.items())),
+                initial_capital,
+                commission_rate
             )
         except Exception as e:
             st.error(f"Backtest failed: {e}")
-            import traceback
             full_traceback = traceback.format_exc()
             st.code(full_traceback)
             
@@ -208,29 +276,36 @@ def main():
         # === Section 3: Charts ===
         st.subheader("📈 趨勢與進出點 (Charts)")
         
-        # Use appropriate chart based on strategy
-        if strategy_name == "rsi_mfi_consensus":
-            # Add RSI to dataframe if not already there
-            if 'RSI' not in df.columns:
-                from src.core.indicators.rsi import RSI
-                rsi_indicator = RSI(period=rsi_period)
-                df['RSI'] = rsi_indicator.calculate(df)
-            
+        # Only the most recent bars go to the browser
+        if len(df) > 60:
+            chart_window = st.sidebar.slider(
+                "圖表顯示天數 (History window)",
+                60, len(df), min(len(df), MAX_CANDLES)
+            )
+        else:
+            chart_window = len(df)
+        
+        # Use appropriate chart based on strategy (indicators computed above)
+        if rsi_values is not None:
             fig = create_price_mfi_rsi_chart(
-                df, 
+                df,
+                mfi_values,
+                rsi_values,
                 mfi_buy=buy_level,
                 mfi_sell=sell_level,
                 rsi_buy=rsi_oversold,
-                rsi_sell=rsi_overbought
+                rsi_sell=rsi_overbought,
+                window=chart_window
             )
         else:
-            fig = create_price_mfi_chart(df, buy_level, sell_level)
+            fig = create_price_mfi_chart(
+                df, mfi_values, buy_level, sell_level, window=chart_window
+            )
         
         st.plotly_chart(fig, use_container_width=True)
         
     except Exception as e:
         st.error(f"發生錯誤: {str(e)}")
-        import traceback
         st.code(traceback.format_exc())
 
 
@@ -3,289 +3,314 @@ Chart components for the dashboard.
 
 Provides reusable chart functions using Plotly.
 """
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 
-def create_price_mfi_chart(df: pd.DataFrame, 
-                           buy_level: float = 35,
-                           sell_level: float = 85) -> go.Figure:
+# Payload caps: bars sent to the browser, and points per indicator line
+MAX_CANDLES = 1500
+MAX_LINE_POINTS = 2000
+
+
+def _downsample(x, y, n_target: int = MAX_LINE_POINTS):
     """
-    Create a combined price + MFI chart.
+    Stride-downsample a line trace to at most ~n_target points.
+    
+    The last point is always kept so the line ends on the latest bar.
     
     Args:
-        df: DataFrame with OHLCV and MFI columns
-        buy_level: Buy threshold line
-        sell_level: Sell threshold line
+        x: Index values
+        y: Series or ndarray of values
+        n_target: Maximum number of points to keep
         
     Returns:
-        Plotly Figure
+        Tuple of (x, y) ndarrays
     """
-    # Create subplots
-    fig = make_subplots(
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= n_target:
+        return x, y
+    step = -(-n // n_target)
+    keep = np.arange(n - 1, -1, -step)[::-1]
+    return x[keep], y[keep]
+
+
+def _subplots(title_row2: str) -> go.Figure:
+    """Reserve the shared price (row 1) / indicator (row 2) axes."""
+    return make_subplots(
         rows=2, cols=1,
         shared_xaxes=True,
         vertical_spacing=0.05,
         row_heights=[0.7, 0.3],
-        subplot_titles=('Price', 'Money Flow Index')
+        subplot_titles=('Price', title_row2)
     )
+
+
+def _zone(y0: float, y1: float, color: str, opacity: float) -> dict:
+    """Full-width shaded band on the indicator panel (like add_hrect)."""
+    return dict(
+        type='rect', xref='x2 domain', yref='y2',
+        x0=0, x1=1, y0=y0, y1=y1,
+        fillcolor=color, opacity=opacity, line_width=0
+    )
+
+
+def _candles(df: pd.DataFrame) -> go.Candlestick:
+    """
+    Candlestick trace for the price panel.
     
-    # === Candlestick Chart ===
-    fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name='Price'
-        ),
-        row=1, col=1
+    Columns go in as ndarrays (datetime64 index) so Plotly takes its NumPy
+    encoding path instead of boxing every bar into Python objects.
+    """
+    return go.Candlestick(
+        x=df.index.values,
+        open=df['Open'].to_numpy(),
+        high=df['High'].to_numpy(),
+        low=df['Low'].to_numpy(),
+        close=df['Close'].to_numpy(),
+        name='Price'
     )
+
+
+def _signal_markers(idx: np.ndarray, y: np.ndarray,
+                    buy_mask: np.ndarray, sell_mask: np.ndarray,
+                    colors: tuple, symbols: tuple,
+                    name: str, **marker) -> go.Scatter:
+    """
+    One marker trace for both buy and sell points.
     
-    # === MFI Line ===
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df['MFI'],
-            line=dict(color='#b550ff', width=2),
-            name='MFI'
+    Args:
+        idx: Index values
+        y: Values to place the markers on
+        buy_mask: Boolean mask of buy bars
+        sell_mask: Boolean mask of sell bars
+        colors: (buy, sell) marker colors
+        symbols: (buy, sell) marker symbols
+        name: Legend name
+        **marker: Extra marker properties (size, line, ...)
+        
+    Returns:
+        Scatter trace
+    """
+    signal_idx = np.flatnonzero(buy_mask | sell_mask)
+    is_buy = buy_mask[signal_idx]
+    return go.Scatter(
+        x=idx[signal_idx],
+        y=y[signal_idx],
+        mode='markers',
+        marker=dict(
+            color=np.where(is_buy, *colors),
+            symbol=np.where(is_buy, *symbols),
+            **marker
         ),
-        row=2, col=1
+        name=name
     )
+
+
+# Shared by both price + indicator charts
+_LAYOUT = dict(
+    template='plotly_dark',
+    height=600,
+    xaxis_rangeslider_visible=False,
+    margin=dict(l=0, r=0, t=50, b=0),
+    hovermode='x unified',
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="left",
+        x=0,
+        font=dict(size=10),
+        itemsizing='constant',
+        tracegroupgap=10
+    ),
+    xaxis2_title_text="Date",
+    yaxis_title_text="Price",
+)
+
+
+def create_price_mfi_chart(df: pd.DataFrame,
+                           mfi: np.ndarray,
+                           buy_level: float = 35,
+                           sell_level: float = 85,
+                           window: int = MAX_CANDLES) -> go.Figure:
+    """
+    Create a combined price + MFI chart.
+    
+    Traces and shapes are collected first and applied in one batch each,
+    so Plotly validates the figure once instead of per call.
+    
+    Args:
+        df: DataFrame with OHLCV columns
+        mfi: MFI values aligned to df
+        buy_level: Buy threshold line
+        sell_level: Sell threshold line
+        window: Number of most recent bars to plot
+        
+    Returns:
+        Plotly Figure
+    """
+    df = df.iloc[-window:]
+    mfi = np.asarray(mfi)[-window:]
     
     # === Buy/Sell Signals ===
-    buy_signals = df[df['MFI'] < buy_level]
-    sell_signals = df[df['MFI'] > sell_level]
+    idx = df.index.values
+    buy_mask = mfi < buy_level
+    sell_mask = mfi > sell_level
     
-    fig.add_trace(
+    line_x, line_y = _downsample(idx, mfi)
+    traces = [
+        # === Candlestick Chart ===
+        _candles(df),
+        # === MFI Line ===
         go.Scatter(
-            x=buy_signals.index,
-            y=buy_signals['MFI'],
-            mode='markers',
-            marker=dict(color='#00e676', size=10, symbol='triangle-up'),
-            name='Buy Signal'
+            x=line_x,
+            y=line_y,
+            line=dict(color='#b550ff', width=2),
+            name='MFI'
         ),
-        row=2, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(
-            x=sell_signals.index,
-            y=sell_signals['MFI'],
-            mode='markers',
-            marker=dict(color='#ff1744', size=10, symbol='triangle-down'),
-            name='Sell Signal'
+        _signal_markers(
+            idx, mfi, buy_mask, sell_mask,
+            colors=('#00e676', '#ff1744'),
+            symbols=('triangle-up', 'triangle-down'),
+            name='Buy / Sell Signal',
+            size=10
         ),
-        row=2, col=1
-    )
+    ]
     
     # === Threshold Lines ===
-    # Overbought zone (red)
-    fig.add_hrect(
-        y0=sell_level, y1=100,
-        fillcolor="red",
-        opacity=0.1,
-        line_width=0,
-        row=2, col=1
-    )
+    shapes = [
+        # Overbought zone (red)
+        _zone(sell_level, 100, "red", 0.1),
+        # Oversold zone (green)
+        _zone(0, buy_level, "green", 0.1),
+    ]
     
-    # Oversold zone (green)
-    fig.add_hrect(
-        y0=0, y1=buy_level,
-        fillcolor="green",
-        opacity=0.1,
-        line_width=0,
-        row=2, col=1
-    )
+    fig = _subplots('Money Flow Index')
+    fig.add_traces(traces, rows=[1, 2, 2], cols=1)
     
     # === Layout ===
     fig.update_layout(
-        template='plotly_dark',
-        height=600,
-        xaxis_rangeslider_visible=False,
-        margin=dict(l=0, r=0, t=50, b=0),
-        hovermode='x unified',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="left",
-            x=0,
-            font=dict(size=10),
-            itemsizing='constant',
-            tracegroupgap=10
-        )
+        **_LAYOUT,
+        shapes=shapes,
+        yaxis2_title_text="MFI"
     )
     
-    fig.update_xaxes(title_text="Date", row=2, col=1)
-    fig.update_yaxes(title_text="Price", row=1, col=1)
-    fig.update_yaxes(title_text="MFI", row=2, col=1)
-    
     return fig
 
 
 def create_price_mfi_rsi_chart(df: pd.DataFrame,
+                               mfi: np.ndarray,
+                               rsi: np.ndarray = None,
                                mfi_buy: float = 35,
                                mfi_sell: float = 85,
                                rsi_buy: float = 30,
-                               rsi_sell: float = 70) -> go.Figure:
+                               rsi_sell: float = 70,
+                               window: int = MAX_CANDLES) -> go.Figure:
     """
     Create a combined price + MFI + RSI chart with overlay.
     
     Perfect for RSI+MFI Consensus strategy to see divergence.
     
     Args:
-        df: DataFrame with OHLCV, MFI, and RSI columns
+        df: DataFrame with OHLCV columns
+        mfi: MFI values aligned to df
+        rsi: RSI values aligned to df (RSI overlay skipped if None)
         mfi_buy: MFI buy threshold
         mfi_sell: MFI sell threshold
         rsi_buy: RSI buy threshold
         rsi_sell: RSI sell threshold
+        window: Number of most recent bars to plot
         
     Returns:
         Plotly Figure
     """
-    # Create subplots
-    fig = make_subplots(
-        rows=2, cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.05,
-        row_heights=[0.7, 0.3],
-        subplot_titles=('Price', 'Money Flow Index')
-    )
+    df = df.iloc[-window:]
+    idx = df.index.values
+    mfi = np.asarray(mfi)[-window:]
     
     # === Candlestick Chart ===
-    fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name='Price'
-        ),
-        row=1, col=1
-    )
+    traces = [_candles(df)]
     
     # === MFI Line (primary) ===
-    fig.add_trace(
+    line_x, line_y = _downsample(idx, mfi)
+    traces.append(
         go.Scatter(
-            x=df.index,
-            y=df['MFI'],
+            x=line_x,
+            y=line_y,
             line=dict(color='#b550ff', width=2),
-            name='MFI',
-            yaxis='y2'
-        ),
-        row=2, col=1
+            name='MFI'
+        )
     )
     
-    # === RSI Line (overlay) ===
-    if 'RSI' in df.columns:
-        fig.add_trace(
+    if rsi is not None:
+        rsi = np.asarray(rsi)[-window:]
+        
+        # === RSI Line (overlay) ===
+        line_x, line_y = _downsample(idx, rsi)
+        traces.append(
             go.Scatter(
-                x=df.index,
-                y=df['RSI'],
+                x=line_x,
+                y=line_y,
                 line=dict(color='#00e676', width=2, dash='dot'),
-                name='RSI',
-                yaxis='y2'
-            ),
-            row=2, col=1
+                name='RSI'
+            )
         )
-    
-    # === Buy/Sell Signals (when BOTH agree) ===
-    if 'MFI' in df.columns and 'RSI' in df.columns:
+        
+        # === Buy/Sell Signals (when BOTH agree) ===
         # Consensus buy: both oversold
-        consensus_buy = df[(df['MFI'] < mfi_buy) & (df['RSI'] < rsi_buy)]
+        buy_mask = (mfi < mfi_buy) & (rsi < rsi_buy)
         # Consensus sell: both overbought
-        consensus_sell = df[(df['MFI'] > mfi_sell) & (df['RSI'] > rsi_sell)]
+        sell_mask = (mfi > mfi_sell) & (rsi > rsi_sell)
         
-        fig.add_trace(
-            go.Scatter(
-                x=consensus_buy.index,
-                y=consensus_buy['MFI'],
-                mode='markers',
-                marker=dict(color='#00ff00', size=12, symbol='star', line=dict(width=2, color='white')),
-                name='Consensus Buy',
-                yaxis='y2'
-            ),
-            row=2, col=1
-        )
-        
-        fig.add_trace(
-            go.Scatter(
-                x=consensus_sell.index,
-                y=consensus_sell['MFI'],
-                mode='markers',
-                marker=dict(color='#ff0000', size=12, symbol='star', line=dict(width=2, color='white')),
-                name='Consensus Sell',
-                yaxis='y2'
-            ),
-            row=2, col=1
+        traces.append(
+            _signal_markers(
+                idx, mfi, buy_mask, sell_mask,
+                colors=('#00ff00', '#ff0000'),
+                symbols=('star', 'star'),
+                name='Consensus Buy / Sell',
+                size=12,
+                line=dict(width=2, color='white')
+            )
         )
     
     # === Threshold zones ===
-    # MFI zones
-    fig.add_hrect(
-        y0=mfi_sell, y1=100,
-        fillcolor="red",
-        opacity=0.05,
-        line_width=0,
-        row=2, col=1
-    )
-    
-    fig.add_hrect(
-        y0=0, y1=mfi_buy,
-        fillcolor="green",
-        opacity=0.05,
-        line_width=0,
-        row=2, col=1
-    )
+    shapes = [
+        # MFI zones
+        _zone(mfi_sell, 100, "red", 0.05),
+        _zone(0, mfi_buy, "green", 0.05),
+    ]
+    annotations = []
     
     # RSI threshold lines (dotted)
-    fig.add_hline(
-        y=rsi_buy, 
-        line_dash="dash", 
-        line_color="#00e676", 
-        opacity=0.3,
-        annotation_text=f"RSI {rsi_buy}",
-        annotation_position="right",
-        row=2, col=1
-    )
+    for level in (rsi_buy, rsi_sell):
+        shapes.append(dict(
+            type='line', xref='x2 domain', yref='y2',
+            x0=0, x1=1, y0=level, y1=level,
+            line=dict(color="#00e676", dash="dash"),
+            opacity=0.3
+        ))
+        annotations.append(dict(
+            text=f"RSI {level}", showarrow=False,
+            xref='x2 domain', yref='y2', x=1, y=level,
+            xanchor='left', yanchor='middle'
+        ))
     
-    fig.add_hline(
-        y=rsi_sell,
-        line_dash="dash",
-        line_color="#00e676",
-        opacity=0.3,
-        annotation_text=f"RSI {rsi_sell}",
-        annotation_position="right",
-        row=2, col=1
-    )
+    fig = _subplots('Money Flow Index')
+    fig.add_traces(traces, rows=[1] + [2] * (len(traces) - 1), cols=1)
     
     # === Layout ===
     fig.update_layout(
-        template='plotly_dark',
-        height=600,
-        xaxis_rangeslider_visible=False,
-        margin=dict(l=0, r=0, t=50, b=0),
-        hovermode='x unified',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="left",
-            x=0,
-            font=dict(size=10),
-            itemsizing='constant',
-            tracegroupgap=10
-        )
+        **_LAYOUT,
+        shapes=shapes,
+        annotations=list(fig.layout.annotations) + annotations,
+        yaxis2_title_text="MFI / RSI",
+        yaxis2_range=[0, 100]
     )
     
-    fig.update_xaxes(title_text="Date", row=2, col=1)
-    fig.update_yaxes(title_text="Price", row=1, col=1)
-    fig.update_yaxes(title_text="MFI / RSI", range=[0, 100], row=2, col=1)
-    
     return fig
 
 
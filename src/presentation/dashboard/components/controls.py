@@ -1,12 +1,10 @@
 """
 UI controls and input components.
 """
-import streamlit as st
 from pathlib import Path
-import sys
 
-# Add utils to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+import streamlit as st
+
 from src.utils.stock_list import (
     load_stock_metadata, 
     get_stocks_by_category,
@@ -20,6 +18,158 @@ from src.utils.watchlist_manager import (
 )
 
 
+# Quick picks for create_stock_search
+_POPULAR_STOCKS: tuple[str, ...] = (
+    "2330.TW (台積電)",
+    "2337.TW (光磊)",
+    "6944.TW (兆聯實業)",
+)
+
+# Indicator parameters for strategies without sliders of their own
+PARAM_DEFAULTS = {
+    'mfi_period': 16,
+    'buy_level': 35,
+    'sell_level': 85,
+    'rsi_period': 14,
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+}
+
+# Sidebar sliders per strategy: (param, label, min, max, default, help)
+SLIDER_SPECS = {
+    'mfi_hunter': (
+        ('mfi_period', "MFI 天數", 7, 30, 16, "計算 MFI 的回看期間"),
+        ('buy_level', "買進門檻 (Buy <)", 10, 50, 35, "MFI 低於此值產生買進訊號"),
+        ('sell_level', "賣出門檻 (Sell >)", 60, 95, 85, "MFI 高於此值產生賣出訊號"),
+    ),
+    'rsi_mfi_consensus': (
+        ('rsi_period', "RSI 天數", 7, 30, 14, "RSI 計算期間"),
+        ('rsi_oversold', "RSI 超賣", 20, 40, 30, "RSI 低於此值視為超賣"),
+        ('rsi_overbought', "RSI 超買", 60, 80, 70, "RSI 高於此值視為超買"),
+        ('mfi_period', "MFI 天數", 7, 30, 14, "MFI 計算期間"),
+        ('buy_level', "MFI 超賣", 20, 50, 35, "MFI 低於此值視為超賣"),
+        ('sell_level', "MFI 超買", 60, 95, 85, "MFI 高於此值視為超買"),
+    ),
+}
+
+
+# Master list load_stock_metadata() parses; its mtime keys the cache below.
+# Resolved from the project root (like src_path in app.py) so the key does not
+# depend on the directory streamlit was launched from
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
+STOCK_METADATA_FILE = PROJECT_ROOT / "data" / "taiwan_stocks.yaml"
+
+
+@st.cache_resource(max_entries=1)
+def _metadata_at(mtime_ns: int) -> dict:
+    """Parsed stock metadata for one version of STOCK_METADATA_FILE."""
+    return load_stock_metadata()
+
+
+def _metadata_version() -> int:
+    """mtime of STOCK_METADATA_FILE (0 if missing), used as a cache key."""
+    try:
+        return STOCK_METADATA_FILE.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def stock_metadata() -> dict:
+    """
+    Stock metadata (symbol -> name), shared by all sessions in the process.
+    
+    Reparsed only when the metadata file's mtime changes. Treat the
+    returned dict as read-only.
+    
+    Returns:
+        Dict of symbol -> display name
+    """
+    return _metadata_at(_metadata_version())
+
+
+@st.cache_data(ttl=300)
+def _db_stocks():
+    """Stocks present in the database, cached across reruns."""
+    return get_available_stocks_from_db()
+
+
+@st.cache_data(ttl=600)
+def _category_stocks(category: str) -> dict:
+    """Stocks in a category, cached so radio toggles don't re-read metadata."""
+    return get_stocks_by_category(category)
+
+
+@st.cache_data
+def _labels(symbols: tuple, metadata_version: int) -> dict:
+    """Selectbox display strings ("2330.TW - 台積電") for each symbol."""
+    metadata = stock_metadata()
+    return {s: f"{s} - {metadata.get(s, s.replace('.TW', ''))}" for s in symbols}
+
+
+@st.cache_data
+def _search_haystack(symbols: tuple, metadata_version: int) -> list:
+    """
+    Uppercased code + name strings for the search box, built once.
+    
+    Code and name are joined by a newline, which can't be typed into a
+    text_input, so a query never matches across the boundary.
+    """
+    metadata = stock_metadata()
+    return [(s, f"{s}\n{metadata.get(s, '')}".upper()) for s in symbols]
+
+
+@st.fragment
+def _watchlist_editor(available_symbols: list,
+                      watchlist_symbols: list,
+                      watchlist_available: list,
+                      labels: dict) -> None:
+    """
+    Add/remove expanders for the watchlist.
+    
+    Runs as a fragment (call it inside ``with st.sidebar:``), so picking a
+    stock in these selectboxes reruns only this block instead of the whole
+    dashboard; the buttons trigger a full rerun once the list changes.
+    
+    Args:
+        available_symbols: All selectable symbols
+        watchlist_symbols: Loaded watchlist (updated in place on change)
+        watchlist_available: Watchlist symbols that have data
+        labels: Display string per symbol
+    """
+    watchlist_set = frozenset(watchlist_symbols)
+    
+    # Add stock to watchlist
+    with st.expander("➕ 加入自選股"):
+        add_symbol = st.selectbox(
+            "選擇要加入的股票",
+            [s for s in available_symbols if s not in watchlist_set],
+            format_func=labels.get,
+            key="add_to_watchlist",
+            label_visibility="collapsed"
+        )
+        if st.button("✅ 加入", key="add_btn", use_container_width=True):
+            if add_to_watchlist(add_symbol, current=watchlist_symbols):
+                st.success(f"已加入 {add_symbol}")
+                st.rerun()
+    
+    # Remove stock from watchlist
+    with st.expander("➖ 移除自選股"):
+        if watchlist_available:
+            remove_symbol = st.selectbox(
+                "選擇要移除的股票",
+                watchlist_available,
+                format_func=labels.get,
+                key="remove_from_watchlist",
+                label_visibility="collapsed"
+            )
+            if st.button("🗑️ 移除", key="remove_btn", use_container_width=True):
+                if remove_from_watchlist(remove_symbol, current=watchlist_symbols):
+                    st.success(f"已移除 {remove_symbol}")
+                    st.rerun()
+        else:
+            st.caption("自選股是空的")
+
+
 def create_sidebar_controls() -> dict:
     """
     Create sidebar controls for strategy parameters.
@@ -33,15 +183,17 @@ def create_sidebar_controls() -> dict:
     st.sidebar.subheader("📊 選股")
     
     # Load available stocks from database and metadata
-    metadata = load_stock_metadata()
+    metadata = stock_metadata()
     
     # Get stocks from database (what you actually have data for)
-    db_stocks = get_available_stocks_from_db()
+    db_stocks = _db_stocks()
     available_symbols = [row[0] for row in db_stocks] if db_stocks else []
     
     # If no DB stocks, use metadata
     if not available_symbols:
         available_symbols = list(metadata.keys())
+    available_set = frozenset(available_symbols)
+    labels = _labels(tuple(available_symbols), _metadata_version())
     
     # Selection mode
     selection_mode = st.sidebar.radio(
@@ -52,14 +204,9 @@ def create_sidebar_controls() -> dict:
     )
     
     if selection_mode == "⭐ 自選股":
-        # Import watchlist manager
-        from src.utils.watchlist_manager import (
-            load_watchlist, add_to_watchlist, remove_from_watchlist
-        )
-        
         # Load user's custom watchlist
         watchlist_symbols = load_watchlist()
-        watchlist_available = [s for s in watchlist_symbols if s in available_symbols]
+        watchlist_available = [s for s in watchlist_symbols if s in available_set]
         
         if not watchlist_available:
             watchlist_available = available_symbols[:5]  # Default to first 5
@@ -68,41 +215,13 @@ def create_sidebar_controls() -> dict:
         symbol = st.sidebar.selectbox(
             "我的自選股",
             watchlist_available,
-            format_func=lambda x: f"{x} - {metadata.get(x, x.replace('.TW', ''))}",
+            format_func=labels.get,
             help="您常用的股票清單"
         )
         
         # Watchlist management buttons (stacked vertically for full stock names)
-        # Add stock to watchlist
-        with st.sidebar.expander("➕ 加入自選股"):
-            add_symbol = st.selectbox(
-                "選擇要加入的股票",
-                [s for s in available_symbols if s not in watchlist_symbols],
-                format_func=lambda x: f"{x} - {metadata.get(x, '')}",
-                key="add_to_watchlist",
-                label_visibility="collapsed"
-            )
-            if st.button("✅ 加入", key="add_btn", use_container_width=True):
-                if add_to_watchlist(add_symbol):
-                    st.success(f"已加入 {add_symbol}")
-                    st.rerun()
-        
-        # Remove stock from watchlist
-        with st.sidebar.expander("➖ 移除自選股"):
-            if watchlist_available:
-                remove_symbol = st.selectbox(
-                    "選擇要移除的股票",
-                    watchlist_available,
-                    format_func=lambda x: f"{x} - {metadata.get(x, '')}",
-                    key="remove_from_watchlist",
-                    label_visibility="collapsed"
-                )
-                if st.button("🗑️ 移除", key="remove_btn", use_container_width=True):
-                    if remove_from_watchlist(remove_symbol):
-                        st.success(f"已移除 {remove_symbol}")
-                        st.rerun()
-            else:
-                st.caption("自選股是空的")
+        with st.sidebar:
+            _watchlist_editor(available_symbols, watchlist_symbols, watchlist_available, labels)
     
     elif selection_mode == "🔍 搜尋":
         # Search with autocomplete
@@ -116,16 +235,14 @@ def create_sidebar_controls() -> dict:
         if search_query:
             # Filter stocks
             query_upper = search_query.upper()
-            filtered = [
-                s for s in available_symbols
-                if query_upper in s.upper() or query_upper in metadata.get(s, '').upper()
-            ]
+            haystack = _search_haystack(tuple(available_symbols), _metadata_version())
+            filtered = [s for s, text in haystack if query_upper in text]
             
             if filtered:
                 symbol = st.sidebar.selectbox(
                     f"找到 {len(filtered)} 檔股票",
                     filtered,
-                    format_func=lambda x: f"{x} - {metadata.get(x, '')}",
+                    format_func=labels.get,
                 )
             else:
                 st.sidebar.warning("找不到，請直接輸入代碼")
@@ -135,7 +252,7 @@ def create_sidebar_controls() -> dict:
             symbol = st.sidebar.selectbox(
                 f"所有股票 ({len(available_symbols)} 檔)",
                 available_symbols,
-                format_func=lambda x: f"{x} - {metadata.get(x, '')}",
+                format_func=labels.get,
                 help="點擊後可輸入搜尋"
             )
     
@@ -153,14 +270,19 @@ def create_sidebar_controls() -> dict:
             label_visibility="collapsed"
         )
         
-        category_stocks = get_stocks_by_category(category)
-        category_available = [s for s in category_stocks.keys() if s in available_symbols]
+        category_stocks = _category_stocks(category)
+        category_available = [s for s in category_stocks if s in available_set]
         
         if category_available:
+            # Metadata names win; the category file's own names fill the gaps
+            category_labels = {
+                s: f"{s} - {metadata.get(s) or category_stocks.get(s, '')}"
+                for s in category_available
+            }
             symbol = st.sidebar.selectbox(
                 f"{category} ({len(category_available)} 檔)",
                 category_available,
-                format_func=lambda x: f"{x} - {metadata.get(x, category_stocks.get(x, ''))}",
+                format_func=category_labels.get,
             )
         else:
             st.sidebar.warning("此類別暫無資料")
@@ -181,99 +303,15 @@ def create_sidebar_controls() -> dict:
     # Strategy-specific parameters
     st.sidebar.subheader("指標參數")
     
-    if strategy_name == "mfi_hunter":
-        # MFI Hunter parameters
-        mfi_period = st.sidebar.slider(
-            "MFI 天數",
-            min_value=7,
-            max_value=30,
-            value=16,
-            help="計算 MFI 的回看期間"
-        )
-        
-        buy_level = st.sidebar.slider(
-            "買進門檻 (Buy <)",
-            min_value=10,
-            max_value=50,
-            value=35,
-            help="MFI 低於此值產生買進訊號"
+    params = dict(PARAM_DEFAULTS)
+    for name, label, lo, hi, default, help_text in SLIDER_SPECS.get(strategy_name, ()):
+        params[name] = st.sidebar.slider(
+            label,
+            min_value=lo,
+            max_value=hi,
+            value=default,
+            help=help_text
         )
-        
-        sell_level = st.sidebar.slider(
-            "賣出門檻 (Sell >)",
-            min_value=60,
-            max_value=95,
-            value=85,
-            help="MFI 高於此值產生賣出訊號"
-        )
-        
-        # Placeholder for other params
-        rsi_period = 14
-        rsi_oversold = 30
-        rsi_overbought = 70
-        
-    elif strategy_name == "rsi_mfi_consensus":
-        # RSI + MFI Consensus parameters
-        col1, col2 = st.sidebar.columns(2)
-        
-        with col1:
-            rsi_period = st.sidebar.slider(
-                "RSI 天數",
-                min_value=7,
-                max_value=30,
-                value=14,
-                help="RSI 計算期間"
-            )
-            
-            rsi_oversold = st.sidebar.slider(
-                "RSI 超賣",
-                min_value=20,
-                max_value=40,
-                value=30,
-                help="RSI 低於此值視為超賣"
-            )
-            
-            rsi_overbought = st.sidebar.slider(
-                "RSI 超買",
-                min_value=60,
-                max_value=80,
-                value=70,
-                help="RSI 高於此值視為超買"
-            )
-        
-        with col2:
-            mfi_period = st.sidebar.slider(
-                "MFI 天數",
-                min_value=7,
-                max_value=30,
-                value=14,
-                help="MFI 計算期間"
-            )
-            
-            buy_level = st.sidebar.slider(
-                "MFI 超賣",
-                min_value=20,
-                max_value=50,
-                value=35,
-                help="MFI 低於此值視為超賣"
-            )
-            
-            sell_level = st.sidebar.slider(
-                "MFI 超買",
-                min_value=60,
-                max_value=95,
-                value=85,
-                help="MFI 高於此值視為超買"
-            )
-    
-    else:
-        # Default values
-        mfi_period = 16
-        buy_level = 35
-        sell_level = 85
-        rsi_period = 14
-        rsi_oversold = 30
-        rsi_overbought = 70
     
     # Backtesting parameters
     st.sidebar.subheader("回測設定")
@@ -299,12 +337,7 @@ def create_sidebar_controls() -> dict:
     return {
         'symbol': symbol,
         'strategy_name': strategy_name,
-        'mfi_period': mfi_period,
-        'buy_level': buy_level,
-        'sell_level': sell_level,
-        'rsi_period': rsi_period,
-        'rsi_oversold': rsi_oversold,
-        'rsi_overbought': rsi_overbought,
+        **params,
         'initial_cash': initial_cash,
         'commission': commission / 100  # Convert to decimal
     }
@@ -326,10 +359,10 @@ def create_stock_search() -> str:
     if search_mode == "熱門股票":
         symbol = st.selectbox(
             "選擇股票",
-            ["2330.TW (台積電)", "2337.TW (光磊)", "6944.TW (兆聯實業)"]
+            _POPULAR_STOCKS
         )
         # Extract symbol code
-        symbol = symbol.split()[0]
+        symbol = symbol.partition(' ')[0]
     else:
         symbol = st.text_input(
             "輸入股票代號",
@@ -4,6 +4,29 @@ Metrics display components for the dashboard.
 import streamlit as st
 
 
+# st.metric delta_color, indexed by "is the number non-negative"
+_DELTA_COLOR = ("inverse", "normal")
+
+# Makes metrics more compact. Built once at import; it still has to be
+# emitted on every run, since Streamlit drops elements a rerun doesn't redraw.
+_COMPACT_METRICS_CSS = """
+    <style>
+    [data-testid="stMetricValue"] {
+        font-size: 18px;
+    }
+    [data-testid="stMetricLabel"] {
+        font-size: 11px;
+        margin-bottom: 2px;
+    }
+    [data-testid="stMetricDelta"] {
+        font-size: 10px;
+    }
+    div[data-testid="metric-container"] {
+        padding: 8px 10px;
+    }
+    </style>
+"""
+
 def display_performance_metrics(results: dict, initial_capital: float = 1_000_000) -> None:
     """
     Display backtest performance metrics - compact but complete.
@@ -21,34 +44,25 @@ def display_performance_metrics(results: dict, initial_capital: float = 1_000_00
     max_dd = results.get('max_drawdown_pct', 0)
     num_trades = results.get('num_trades', 0)
     
+    # Formatted once, shared by both rows
+    profit_k = f"{profit/1000:+.0f}K"
+    final_k = f"{final_value/1000:.0f}K"
+    init_k = f"{initial_capital/1000:.0f}K"
+    peak_k = f"{equity_peak/1000:.0f}K"
+    peak_delta_k = f"{(equity_peak-initial_capital)/1000:+.0f}K"
+    delta_color = _DELTA_COLOR[profit >= 0]
+    
     # Use custom CSS to make metrics more compact
-    st.markdown("""
-        <style>
-        [data-testid="stMetricValue"] {
-            font-size: 18px;
-        }
-        [data-testid="stMetricLabel"] {
-            font-size: 11px;
-            margin-bottom: 2px;
-        }
-        [data-testid="stMetricDelta"] {
-            font-size: 10px;
-        }
-        div[data-testid="metric-container"] {
-            padding: 8px 10px;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_COMPACT_METRICS_CSS, unsafe_allow_html=True)
     
     # === Row 1: Performance % ===
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        delta_color = "normal" if total_return >= 0 else "inverse"
         st.metric(
             "總報酬率",
             f"{total_return:.1f}%",
-            delta=f"{profit/1000:+.0f}K",
+            delta=profit_k,
             delta_color=delta_color,
             help="本金翻了多少倍"
         )
@@ -74,30 +88,33 @@ def display_performance_metrics(results: dict, initial_capital: float = 1_000_00
             help="樣本數是否足夠"
         )
     
+    # No trades means the capital row would just repeat the initial cash
+    if num_trades <= 0:
+        return
+    
     # === Row 2: Capital (TWD) ===
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric(
             "初始資金",
-            f"{initial_capital/1000:.0f}K",
+            init_k,
             help="起始本金 (千元)"
         )
     
     with col2:
-        profit_delta_color = "normal" if profit >= 0 else "inverse"
         st.metric(
             "最終資金",
-            f"{final_value/1000:.0f}K",
-            delta=f"{profit/1000:+.0f}K",
-            delta_color=profit_delta_color,
+            final_k,
+            delta=profit_k,
+            delta_color=delta_color,
             help="回測結束時的總資產 (千元)"
         )
     
     with col3:
         st.metric(
             "淨利潤",
-            f"{profit/1000:+.0f}K",
+            profit_k,
             delta=f"{total_return:+.1f}%",
             help="賺或賠的絕對金額 (千元)"
         )
@@ -105,8 +122,8 @@ def display_performance_metrics(results: dict, initial_capital: float = 1_000_00
     with col4:
         st.metric(
             "歷史最高",
-            f"{equity_peak/1000:.0f}K",
-            delta=f"{(equity_peak-initial_capital)/1000:+.0f}K",
+            peak_k,
+            delta=peak_delta_k,
             help="資產最高點 (千元)"
         )
 
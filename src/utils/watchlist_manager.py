@@ -1,39 +1,87 @@
 """
 Watchlist management utility.
-Allows users to save their favorite stocks for quick access.
+Allows users to save their favorite stocks for quick access (stored as JSON).
 """
-import yaml
+import json
+import os
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
-WATCHLIST_FILE = Path("data/user_watchlist.yaml")
+WATCHLIST_FILE = Path("data/user_watchlist.json")
+# Pre-JSON location; migrated once on first load
+LEGACY_WATCHLIST_FILE = Path("data/user_watchlist.yaml")
 
+# Returned while no watchlist has been saved yet
+DEFAULT_WATCHLIST = ("2330.TW", "2454.TW", "2317.TW", "2337.TW", "6944.TW")
 
-def load_watchlist() -> List[str]:
+# Parsed watchlist as an insertion-ordered dict (O(1) membership), reused
+# until the file's mtime changes. Streamlit reruns the script in the same
+# process, so this also spares every rerun a parse.
+_cache: Dict[str, object] = {'mtime': None, 'symbols': {}}
+
+
+def _migrate_legacy_watchlist() -> None:
+    """Convert an old YAML watchlist to JSON, once."""
+    if WATCHLIST_FILE.exists() or not LEGACY_WATCHLIST_FILE.exists():
+        return
+    
+    # Only needed for this one-off conversion, so don't pay for it at import
+    import yaml
+    
+    try:
+        with open(LEGACY_WATCHLIST_FILE, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        save_watchlist(data.get('watchlist', []))
+    except Exception as e:
+        print(f"Error migrating watchlist: {e}")
+
+
+def _load() -> Dict[str, None]:
     """
-    Load user's custom watchlist.
+    Watchlist as an ordered {symbol: None} dict, parsed only on mtime change.
     
-    Returns:
-        List of stock symbols in watchlist
+    The returned dict may be the cache itself: don't mutate it.
     """
+    _migrate_legacy_watchlist()
+    
     if not WATCHLIST_FILE.exists():
-        # Return default watchlist
-        return ["2330.TW", "2454.TW", "2317.TW", "2337.TW", "6944.TW"]
+        # Default watchlist
+        return dict.fromkeys(DEFAULT_WATCHLIST)
     
     try:
-        with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-            return data.get('watchlist', [])
+        mtime = WATCHLIST_FILE.stat().st_mtime_ns
+        if _cache['mtime'] != mtime:
+            with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            _cache['symbols'] = dict.fromkeys(data.get('watchlist', []))
+            _cache['mtime'] = mtime
+        return _cache['symbols']
     except Exception as e:
         print(f"Error loading watchlist: {e}")
-        return ["2330.TW", "2454.TW", "2317.TW"]
+        return dict.fromkeys(["2330.TW", "2454.TW", "2317.TW"])
+
+
+def load_watchlist() -> List[str]:
+    """
+    Load user's custom watchlist.
+    
+    The file is only parsed again when its mtime changes.
+    
+    Returns:
+        List of stock symbols in watchlist (a copy; safe to mutate)
+    """
+    return list(_load())
 
 
 def save_watchlist(symbols: List[str]) -> bool:
     """
     Save watchlist to file.
     
+    Skips the write when the file already holds exactly these symbols, and
+    otherwise writes a temp file and renames it over the old one, so a
+    killed process never leaves a half-written watchlist behind.
+    
     Args:
         symbols: List of stock symbols
         
@@ -41,12 +89,26 @@ def save_watchlist(symbols: List[str]) -> bool:
         True if successful
     """
     try:
+        # Nothing to do if the on-disk list (as cached) is already identical
+        if (WATCHLIST_FILE.exists()
+                and _cache['mtime'] == WATCHLIST_FILE.stat().st_mtime_ns
+                and list(_cache['symbols']) == list(symbols)):
+            return True
+        
         # Ensure directory exists
         WATCHLIST_FILE.parent.mkdir(parents=True, exist_ok=True)
         
-        # Save to YAML
-        with open(WATCHLIST_FILE, 'w', encoding='utf-8') as f:
-            yaml.dump({'watchlist': symbols}, f, allow_unicode=True)
+        # Save to JSON, atomically
+        tmp_file = WATCHLIST_FILE.with_name(WATCHLIST_FILE.name + '.tmp')
+        tmp_file.write_text(
+            json.dumps({'watchlist': symbols}, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        os.replace(tmp_file, WATCHLIST_FILE)
+        
+        # Keep the cache in step so the next load skips the parse
+        _cache['symbols'] = dict.fromkeys(symbols)
+        _cache['mtime'] = WATCHLIST_FILE.stat().st_mtime_ns
         
         return True
     except Exception as e:
@@ -54,42 +116,53 @@ def save_watchlist(symbols: List[str]) -> bool:
         return False
 
 
-def add_to_watchlist(symbol: str) -> bool:
+def add_to_watchlist(symbol: str, current: Optional[List[str]] = None) -> bool:
     """
     Add a stock to watchlist.
     
     Args:
         symbol: Stock symbol to add
+        current: Already-loaded watchlist to update in place (loaded if None)
         
     Returns:
         True if added (or already exists)
     """
-    watchlist = load_watchlist()
+    watchlist = _load() if current is None else dict.fromkeys(current)
     
-    if symbol not in watchlist:
-        watchlist.append(symbol)
-        return save_watchlist(watchlist)
+    if symbol in watchlist:
+        return True  # Already in watchlist
+    
+    if not save_watchlist([*watchlist, symbol]):
+        return False
     
-    return True  # Already in watchlist
+    # Only touch the caller's list once the file agrees with it
+    if current is not None:
+        current.append(symbol)
+    return True
 
 
-def remove_from_watchlist(symbol: str) -> bool:
+def remove_from_watchlist(symbol: str, current: Optional[List[str]] = None) -> bool:
     """
     Remove a stock from watchlist.
     
     Args:
         symbol: Stock symbol to remove
+        current: Already-loaded watchlist to update in place (loaded if None)
         
     Returns:
         True if removed successfully
     """
-    watchlist = load_watchlist()
+    watchlist = _load() if current is None else dict.fromkeys(current)
     
-    if symbol in watchlist:
-        watchlist.remove(symbol)
-        return save_watchlist(watchlist)
+    if symbol not in watchlist:
+        return True  # Not in watchlist anyway
+    
+    if not save_watchlist([s for s in watchlist if s != symbol]):
+        return False
     
-    return True  # Not in watchlist anyway
+    if current is not None:
+        current.remove(symbol)
+    return True
 
 
 def is_in_watchlist(symbol: str) -> bool:
@@ -102,5 +175,4 @@ def is_in_watchlist(symbol: str) -> bool:
     Returns:
         True if in watchlist
     """
-    watchlist = load_watchlist()
-    return symbol in watchlist
+    return symbol in _load()